@@ -2,10 +2,24 @@
 from flask import Blueprint, request, jsonify
 from utils.twitter_bot import TwitterBot
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 bp = Blueprint('post_twitter', __name__)
 
+# 永続セッションモードでは1つのTwitterBot（ブラウザ）をリクエスト間で使い回す
+_bot = None
+_bot_lock = threading.Lock()
+
+def _post_tweet(title, url):
+    """TwitterBotでツイートを投稿する（永続セッションモードでは同じBotを直列に使う）"""
+    global _bot
+    with _bot_lock:
+        bot = _bot or TwitterBot()
+        if bot.persistent_session:
+            _bot = bot
+        return bot.post_tweet(title, url)
+
 @bp.route('/post_twitter', methods=['POST'])
 def post_twitter():
     """
@@ -29,8 +43,7 @@ def post_twitter():
 
     try:
         logger.info(f"Posting tweet: {data['title']}")
-        bot = TwitterBot()
-        success = bot.post_tweet(data['title'], data['url'])
+        success = _post_tweet(data['title'], data['url'])
         
         if not success:
             logger.error("Failed to post tweet")
@@ -4,38 +4,64 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException, StaleElementReferenceException
 import time
 import os
 import logging
-from typing import Optional, Dict, Any
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Dict, Any, Tuple, Union
 from dotenv import load_dotenv
+import atexit
+import base64
+import collections
+import concurrent.futures
+import contextlib
+import email
+import functools
 import gc
+import gzip
+import hashlib
+import imaplib
+import io
+import json
 import signal
+import socket
 import sys
 import psutil
+import queue
+import re
+import threading
+import weakref
+import tracemalloc
 from tenacity import retry, stop_after_attempt, wait_exponential
 import tempfile
 from datetime import datetime
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from email import encoders
+from email.message import EmailMessage
 import random
 from selenium_stealth import stealth
+from PIL import Image
 from selenium.webdriver.common.action_chains import ActionChains
 
 # ログ設定を追加
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('twitter_bot.log'),
-        logging.StreamHandler()
-    ]
-)
+_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    # ログファイルが無制限に肥大化しないようサイズ上限付きでローテーションする
+    RotatingFileHandler('twitter_bot.log', maxBytes=1_000_000, backupCount=3),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+# ファイル・コンソールへの書き込みはバックグラウンドのスレッドで行い、ログ出力がブラウザ操作を待たせないようにする
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_queue_handler = QueueHandler(_log_queue)
+# 書式は書き込み側のハンドラーで適用するため、キューにはメッセージ本文のみを渡す
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+_log_listener.start()
+# 終了時はキューに残ったログを書き出してから止める
+atexit.register(_log_listener.stop)
 
 # Seleniumのデバッグログを無効化
 logging.getLogger('selenium').setLevel(logging.WARNING)
@@ -43,8 +69,251 @@ logging.getLogger('urllib3').setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+# 入力欄への値設定を1回のスクリプト実行で行うJavaScript
+# ReactのinputはvalueのsetterをフックしているためHTMLInputElementのネイティブsetterを使う
+_JS_FILL_SCRIPT = """
+const el = arguments[0];
+el.focus();
+Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set.call(el, arguments[1]);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+# ツイート入力エリア（contenteditable）へテキストを一括挿入するスクリプト
+# execCommand経由で挿入するとエディタ側にも通常の入力イベントとして伝わる
+# （execCommandが無効な環境ではfalseを返す）
+_JS_INSERT_TEXT_SCRIPT = "arguments[0].focus(); return document.execCommand('insertText', false, arguments[1]);"
+
+# CSSセレクタに一致する要素が現れる（clickable指定時は有効化される）までMutationObserverで待つスクリプト
+# ポーリングせず、DOMの変化時のみ判定するため待機全体がWebDriverへの1回の呼び出しで済む
+_JS_WAIT_FOR_SCRIPT = """
+const [sel, clickable, ms, done] = arguments;
+const ready = () => {
+    const el = document.querySelector(sel);
+    if (!el) return null;
+    if (clickable && (el.disabled || el.getAttribute('aria-disabled') === 'true')) return null;
+    return el;
+};
+const found = ready();
+if (found) { done(found); return; }
+const timer = setTimeout(() => { obs.disconnect(); done(null); }, ms);
+const obs = new MutationObserver(() => {
+    const el = ready();
+    if (el) { obs.disconnect(); clearTimeout(timer); done(el); }
+});
+obs.observe(document.documentElement, {subtree: true, childList: true, attributes: true});
+"""
+
+# 要素のロケーター（呼び出しごとに組み立てないようモジュールレベルで定義）
+# テキストでの一致が必要なもの以外は、ブラウザのネイティブなセレクタエンジンで評価されるCSSセレクタを使う
+USERNAME_LOC = (By.CSS_SELECTOR, 'input[autocomplete="username"], input[name="text"]')
+USER_ID_LOC = (By.CSS_SELECTOR, 'input[name="text"][data-testid="ocfEnterTextTextInput"]')
+PASSWORD_LOC = (By.CSS_SELECTOR, 'input[name="password"]')
+CODE_LOC = (By.CSS_SELECTOR, 'input[name="email_code"], input[autocomplete="one-time-code"], input[data-testid="ocfEnterTextTextInput"]')
+ERROR_MODAL_BUTTON_LOC = (By.XPATH, '//button[.//span[text()="OK"]] | //div[@aria-label="Close"]')
+CLOSE_BUTTON_LOC = (By.CSS_SELECTOR, 'div[aria-label="Close"]')
+BODY_LOC = (By.CSS_SELECTOR, 'body')
+# ログイン完了の判定はXPathの和集合ではなくCSSセレクタのリストで行う
+LOGIN_DONE_LOC = (By.CSS_SELECTOR, 'div[data-testid="tweetTextarea_0"], div[aria-label="Home timeline"], a[data-testid="AppTabBar_Home_Link"]')
+POST_LINK_LOC = (By.CSS_SELECTOR, 'a[aria-label="Post"]')
+COMPOSER_LOC = (By.CSS_SELECTOR, 'div[data-testid="tweetComposer"]')
+TWEET_BOX_LOC = (By.CSS_SELECTOR, 'div[data-testid="tweetTextarea_0"]')
+TWEET_BUTTON_LOC = (By.CSS_SELECTOR, 'div[data-testid="tweetComposer"] button[data-testid="tweetButton"]')
+
+# ログイン中のCAPTCHA等のチャレンジ画面
+CHALLENGE_LOC = (By.CSS_SELECTOR, 'iframe[src*="arkoselabs"], iframe[src*="captcha"]')
+
+# ログイン中の各画面の待機時間（秒）。チャレンジ画面が表示された場合のみ延長する
+LOGIN_WAIT_TIMEOUT = 30
+CHALLENGE_WAIT_TIMEOUT = 120
+# 画面の待機が既にタイムアウトした後、続くステップで要素を確認し直す際の待機時間（秒）
+LOGIN_RECHECK_TIMEOUT = 5
+
+# ツイート作成画面を直接開くためのURL
+COMPOSE_URL = 'https://x.com/compose/tweet'
+
+# 投稿画面の各ステップの待機時間（秒）。失敗時に長く待たず、早くエラー通知・後片付けに移る
+COMPOSE_WAIT_TIMEOUT = 15
+TWEET_BUTTON_TIMEOUT = 10
+
+# ログイン成功時のクッキーを保存し、次回起動時のログイン省略に使うファイル
+COOKIE_FILE = os.getenv('TWITTER_BOT_COOKIE_FILE', os.path.expanduser('~/.twitter_bot_cookies.json'))
+
+# Chromeの起動オプション（重複はdict.fromkeysで除去し、_build_chrome_options でプロセスごとに一度だけ組み立てる）
+CHROME_ARGS = tuple(dict.fromkeys([
+    '--headless=new',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--window-size=1280,720',
+    '--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+
+    # 自動化検出対策
+    '--disable-blink-features=AutomationControlled',
+
+    # メモリ最適化オプション
+    '--disable-extensions',
+    '--disable-popup-blocking',
+    '--disable-infobars',
+    '--disable-notifications',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-breakpad',
+    '--disable-component-extensions-with-background-pages',
+    # --disable-features は最後に指定したものしか有効にならないため1つにまとめる
+    # （翻訳UI・Chromeの新しいUI機能・移行ウィンドウを無効化）
+    '--disable-features=TranslateUI,ChromeWhatsNewUI,ChromeMigrationWindow',
+    '--disable-ipc-flooding-protection',
+    '--disable-renderer-backgrounding',
+    '--enable-features=NetworkService,NetworkServiceInProcess',
+    '--force-color-profile=srgb',
+    '--no-first-run', # 永続プロファイル使用時に初回起動画面を出さない
+    '--password-store=basic',
+    '--use-mock-keychain',
+
+    # さらなるステルス対策オプション
+    '--disable-translate', # 翻訳機能を無効化
+    '--hide-scrollbars', # スクロールバーを隠す
+    '--mute-audio', # 音声をミュート
+    '--no-default-browser-check', # デフォルトブラウザチェックを無効化
+    '--disable-component-update', # コンポーネントアップデートを無効化
+    '--disable-speech-api', # 音声APIを無効化
+    '--disable-webrtc-event-logging', # WebRTCイベントログを無効化
+    '--disable-webrtc-multiple-routes', # WebRTCの複数ルートを無効化
+    '--disable-webrtc-stats-gathering', # WebRTC統計情報収集を無効化
+
+    # メモリ制限の設定（--memory-pressure-off はメモリ解放を妨げるため指定しない）
+    '--js-flags=--max-old-space-size=256',
+    '--disable-software-rasterizer',
+    '--disable-dev-tools',
+    '--disable-logging',
+    '--log-level=3',
+    '--silent',
+
+    # 日本語表示のためのオプション
+    '--lang=ja',
+    '--accept-lang=ja',
+    '--force-device-scale-factor=1',
+    '--high-dpi-support=1',
+]))
+
+# 永続セッションモードで使用するChromeプロファイルの保存先
+PROFILE_DIR = os.getenv('TWITTER_BOT_PROFILE_DIR', os.path.expanduser('~/.twitter_bot_profile'))
+
+# ログイン・投稿に不要な画像・動画・フォントの読み込みをCDPでブロックする
+BLOCKED_URL_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.mp4', '*.woff', '*.woff2', '*.ico', '*.svg']
+
+# 画面の再描画で要素が無効になった場合に、要素を取得し直して操作をやり直す回数
+STALE_RETRY_ATTEMPTS = 3
+
+# chromedriverとのHTTP接続プールで保持する接続数（keep-aliveで開いた接続をコマンド間で使い回す）
+DRIVER_POOL_MAXSIZE = 4
+
+# この秒数以上使用していないSMTP接続は、再利用前にNOOPで生存確認する
+SMTP_IDLE_CHECK = 60
+
+# 短時間に続けて発生した通知メールを1通にまとめるための待機時間（秒）
+MAIL_BATCH_WINDOW = 2.0
+
+# スクリーンショットはファイルパス、またはメモリ上の (ファイル名, JPEGデータ) で扱う
+Screenshot = Union[str, Tuple[str, bytes]]
+
+# メール添付用にスクリーンショットを縮小・JPEG化する際の設定
+SCREENSHOT_MAX_SIZE = (960, 540)
+SCREENSHOT_JPEG_QUALITY = 70
+# 同じタグのスクリーンショットを取り直さない間隔（秒）
+SCREENSHOT_MIN_INTERVAL = 2.0
+
+# メモリ上に保持しておく添付ファイル（スクリーンショット）の最大数
+ATTACHMENT_CACHE_SIZE = 16
+_ATTACHMENT_CACHE: collections.OrderedDict = collections.OrderedDict()
+_ATTACHMENT_CACHE_LOCK = threading.Lock()
+
+# この値（MB）を超えてメモリを使用している場合に警告し、GCを実行する
+MEM_LIMIT_MB = int(os.getenv('MEM_LIMIT_MB', '1500'))
+# 前回のGC時点からメモリ使用量がこの倍率を超えて増えた場合のみGCを実行する
+GC_RSS_GROWTH = 1.2
+
+# 同一内容のエラー通知を再送しない期間（秒）
+ALERT_DEDUP_TTL = 300
+
+# エラー通知メールに添付するログ末尾のサイズ（バイト）
+LOG_TAIL_BYTES = 65536
+
+# 認証コードメールが届くまでIMAP（またはGmail API）をポーリングする回数と間隔（秒）
+IMAP_POLL_ATTEMPTS = 10
+IMAP_POLL_INTERVAL = 2
+
+# 認証コードメールを探すIMAPの検索条件（送信元と件名）
+_CODE_MAIL_CRITERIA = ('FROM', '"info@x.com"', 'SUBJECT', '"Your X confirmation code is"')
+
+# 認証コードメールからコードを抽出する正規表現（生のバイト列に対して使用）
+_CODE_RE_TEXT = re.compile(rb'is ([a-zA-Z0-9]+)') # 例: "is 123ABC" の形式
+_CODE_RE_HTML = re.compile(rb'>([a-zA-Z0-9]+)<') # 例: <div>123ABC</div> の形式
+
+
+@functools.lru_cache(maxsize=None)
+def _build_chrome_options(user_data_dir: Optional[str] = None) -> webdriver.ChromeOptions:
+    """ChromeOptionsを組み立てる（オプションは固定のため一度だけ生成して使い回す）"""
+    options = webdriver.ChromeOptions()
+    for arg in CHROME_ARGS:
+        options.add_argument(arg)
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    # DOMContentLoadedの時点でナビゲーションを完了とし、後続のトラッカー等の読み込みを待たない
+    options.page_load_strategy = 'eager'
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+    return options
+
+
+def _attachment_key(path: str) -> Tuple[str, float, int]:
+    """添付ファイルキャッシュのキー（パス・更新時刻・サイズ）を返す"""
+    st = os.stat(path)
+    return path, st.st_mtime, st.st_size
+
+
+def _cache_attachment(path: str, data: bytes):
+    """添付ファイルの内容をキャッシュに登録する（上限を超えた場合は古いものから破棄する）"""
+    with _ATTACHMENT_CACHE_LOCK:
+        _ATTACHMENT_CACHE[_attachment_key(path)] = data
+        while len(_ATTACHMENT_CACHE) > ATTACHMENT_CACHE_SIZE:
+            _ATTACHMENT_CACHE.popitem(last=False)
+
+
+def _read_attachment(path: str) -> bytes:
+    """添付ファイルの内容を読み込む（キャッシュ済みであればファイルを読まずに返す）"""
+    key = _attachment_key(path)
+    with _ATTACHMENT_CACHE_LOCK:
+        data = _ATTACHMENT_CACHE.get(key)
+        if data is not None:
+            _ATTACHMENT_CACHE.move_to_end(key)
+            return data
+    with open(path, 'rb') as f:
+        data = f.read()
+    _cache_attachment(path, data)
+    return data
+
+
+# 通知メールの送信キュー（Botが破棄されれば自動的に外れるよう弱参照で保持する）
+_MAIL_QUEUES: "weakref.WeakSet[queue.Queue]" = weakref.WeakSet()
+
+
+def _drain_mail_queues():
+    """終了時に、各Botのワーカースレッドが送信待ちの通知メールを送り終えるまで待つ"""
+    for mail_q in list(_MAIL_QUEUES):
+        mail_q.join()
+
+
+# Botごとに登録するとatexitがBotへの参照を持ち続けるため、モジュールで一度だけ登録する
+atexit.register(_drain_mail_queues)
+
+
 class TwitterBot:
-    def __init__(self):
+    def __init__(self, reuse_session: Optional[bool] = None, keep_driver: bool = False):
         load_dotenv()
         self.twitter_id = os.getenv('TWITTER_ID')
         self.twitter_user_id = os.getenv('TWITTER_USER_ID')
@@ -61,9 +330,62 @@ class TwitterBot:
         # if not all([self.smtp_email, self.smtp_password, self.notification_email]):
         #     logger.warning("SMTP_EMAIL, SMTP_PASSWORD, and NOTIFICATION_EMAIL are not set. Email notifications will be disabled.")
             
+        # ログイン途中のデバッグ用スクリーンショットは明示的に有効化した場合のみ取得する
+        self.debug_screenshots = os.getenv('TWITTER_BOT_DEBUG_SHOTS') == '1'
+        # ログイン試行中に取得したスクリーンショット（タグ -> パス）
+        self._shots: Dict[str, Screenshot] = {}
+        # タグごとの最終スクリーンショット取得時刻（短時間での取り直しを防ぐ）
+        self._shot_times: Dict[str, float] = {}
+        # 認証コードのメール取得をブラウザ操作と並行して行うためのスレッド（最初の取得時に起動し、cleanupで停止する）
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._code_future: Optional[concurrent.futures.Future] = None
+        # 実行中の認証コード取得（メールのポーリング）を中止させるためのイベント
+        self._code_cancel = threading.Event()
+        # 今回のログインで届く認証コードメールだけを対象にするための基準（IMAPの最小UID、Gmail APIの送信時刻）
+        self._code_min_uid: Optional[int] = None
+        self._code_after: Optional[int] = None
+        # エラー通知の重複抑止用（内容のハッシュ -> 最終送信時刻）
+        self._alert_cache: Dict[str, float] = {}
+        # 1回の実行中に発生した通知（実行の終わりに1通のレポートとしてまとめて送る）
+        self._pending_notifications: list[Dict[str, Any]] = []
+        # メモリ使用量の取得に使う自プロセスのハンドル
+        self._proc = psutil.Process()
+        # 最後にGCを実行した時点の常駐メモリ量（MB）
+        self._rss_hwm = 0.0
+        # メモリ調査用のヒープ追跡は、オーバーヘッドが大きいため明示的に有効化した場合のみ行う
+        if os.getenv('BOT_TRACEMALLOC') == '1':
+            tracemalloc.start()
+        # 永続セッションモードではドライバーとログイン状態を複数の投稿で使い回す（未指定時は環境変数に従う）
+        if reuse_session is None:
+            reuse_session = os.getenv('TWITTER_BOT_PERSISTENT') == '1'
+        self.persistent_session = reuse_session
+        # 成功した投稿の後もドライバーを閉じずに次の投稿で使うか（プロファイルの保存は永続セッションモードのみ）
+        self.keep_driver = keep_driver or reuse_session
+        # 現在のドライバーでログイン済みを確認できたか（確認後はホーム画面の再確認を省く）
+        self._session_verified = False
+        # 直前の投稿から引き継いだドライバーを使っているか（新しく起動したドライバーはログイン済みになり得ない）
+        self._driver_reused = False
+        # _ui_stepでスクリーンショット・通知まで済ませた直近の例外
+        self._reported_error: Optional[BaseException] = None
+
         self.driver = None
+        # 最後に遷移したURL（ドライバーから現在のURLを取得できない場合のエラー報告に使う）
+        self._last_url = "N/A"
         self.wait = None
         self.modal_wait = None
+        self._smtp: Optional[smtplib.SMTP_SSL] = None
+        self._smtp_last_used = 0.0
+        self._imap: Optional[imaplib.IMAP4_SSL] = None
+        self._gmail_service = None
+        # 通知メールはバックグラウンドのワーカースレッドから送信する
+        # （スレッドは送信するメールができた時点で起動し、cleanup後に送り終えると終了する）
+        self._mail_q: queue.Queue = queue.Queue()
+        self._mail_lock = threading.Lock()
+        self._mail_thread: Optional[threading.Thread] = None
+        _MAIL_QUEUES.add(self._mail_q)
+        # 永続セッションモードでは投稿ごとにcleanupしないため、終了時にまとめて閉じる
+        if self.persistent_session:
+            atexit.register(self.close)
         self._setup_signal_handlers()
         
     def _setup_signal_handlers(self):
@@ -76,34 +398,119 @@ class TwitterBot:
         signal.signal(signal.SIGTERM, signal_handler)
         signal.signal(signal.SIGINT, signal_handler)
         
+    def close(self):
+        """永続セッションで使い回しているドライバー等を閉じる"""
+        # 明示的に閉じた場合は、終了時に重ねて閉じないよう登録を解除する
+        atexit.unregister(self.close)
+        if self.driver is not None or self._smtp is not None or self._imap is not None:
+            self.cleanup()
+
     def cleanup(self):
         """リソースのクリーンアップ"""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except Exception as e:
-                logger.error(f"Error during driver cleanup: {str(e)}")
-            finally:
-                self.driver = None
+        self._quit_driver()
+        # 通知メールの送信完了は待たずに戻る。SMTP接続はワーカースレッドが送信待ちのメールを送り終えてから閉じる
+        # （プロセス終了時はatexitの_drain_mail_queuesで送信完了を待つ）
+        self._flush_notifications()
+        self._stop_mail_worker()
+        # 認証コードの取得を中止させ、取得処理がIMAP接続を使い終えてから閉じる
+        self._stop_code_retrieval()
+        self._close_imap()
         gc.collect()
+        if tracemalloc.is_tracing():
+            self._log_heap_snapshot()
+
+    def _log_heap_snapshot(self, limit: int = 10):
+        """ヒープのスナップショットを取得し、メモリを多く確保している箇所をログに出力する"""
+        snapshot = tracemalloc.take_snapshot()
+        logger.info(f"Top {limit} memory allocations:")
+        for stat in snapshot.statistics('lineno')[:limit]:
+            logger.info(f"  {stat}")
         
+    def _quit_driver(self):
+        """ドライバーを終了し、取り残されたChromeのプロセスも終了させる"""
+        if not self.driver:
+            return
+        # quit()後に取り残されたレンダラー等を終了させるため、先に子プロセスを把握しておく
+        chrome_processes = self._chrome_child_processes()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.error(f"Error during driver cleanup: {str(e)}")
+        finally:
+            self.driver = None
+            self._session_verified = False
+        self._reap_processes(chrome_processes)
+
+    def _ensure_driver(self):
+        """ドライバーを用意する（永続セッションで使い回すドライバーが応答しない場合は起動し直す）"""
+        if self.driver is not None:
+            try:
+                # セッションが生きているかを軽い呼び出しで確認する
+                self.driver.window_handles
+                self._driver_reused = True
+                return
+            except WebDriverException as e:
+                logger.warning(f"Existing driver session is no longer usable, restarting Chrome: {str(e)}")
+                self._quit_driver()
+        self._setup_driver()
+        self._driver_reused = False
+        logger.info("Driver setup complete in post_tweet")
+
+    def _chrome_child_processes(self) -> list[psutil.Process]:
+        """chromedriverから起動されたChrome関連の子プロセスを返す"""
+        try:
+            return psutil.Process(self.driver.service.process.pid).children(recursive=True)
+        except (AttributeError, psutil.Error) as e:
+            logger.warning(f"Failed to list Chrome processes: {str(e)}")
+            return []
+
+    def _reap_processes(self, processes: list[psutil.Process]):
+        """終了していないプロセスを終了させる"""
+        alive = [p for p in processes if p.is_running()]
+        if not alive:
+            return
+        logger.warning(f"Terminating {len(alive)} orphaned Chrome processes")
+        for p in alive:
+            try:
+                p.terminate()
+            except psutil.Error:
+                pass
+        _, still_alive = psutil.wait_procs(alive, timeout=3)
+        for p in still_alive:
+            try:
+                p.kill()
+            except psutil.Error:
+                pass
+
     def _check_memory_usage(self):
         """メモリ使用量をチェック"""
         try:
-            process = psutil.Process(os.getpid())
-            memory_info = process.memory_info()
-            memory_percent = process.memory_percent()
-            logger.info(f"Memory usage: {memory_info.rss / 1024 / 1024:.2f} MB ({memory_percent:.1f}%) ")
+            rss_mb = self._rss_mb()
+            logger.info(f"Memory usage: {rss_mb:.2f} MB")
             
-            if memory_percent > 80:
+            if rss_mb > MEM_LIMIT_MB:
                 logger.warning("High memory usage detected")
-                self._save_screenshot('high_memory')
-                gc.collect()
+                # CDPでメモリ上に取得し、この実行のエラー通知に添付されるようにする
+                self._shot('high_memory')
+            self._maybe_collect(rss_mb)
         except Exception as e:
             logger.error(f"Failed to check memory usage: {str(e)}")
+
+    def _maybe_collect(self, rss_mb: Optional[float] = None):
+        """前回のGC以降にメモリ使用量が GC_RSS_GROWTH 倍を超えて増えた場合のみGCを実行する"""
+        if rss_mb is None:
+            rss_mb = self._rss_mb()
+        if rss_mb <= self._rss_hwm * GC_RSS_GROWTH:
+            return
+        gc.collect()
+        self._rss_hwm = self._rss_mb()
             
+    def _rss_mb(self) -> float:
+        """自プロセスの常駐メモリ量（MB）を返す"""
+        return self._proc.memory_info().rss / 1024 / 1024
+
     def _save_screenshot(self, error_type: str) -> str:
-        """スクリーンショットを保存し、保存先のパスを返す"""
+        """スクリーンショットを保存し、保存先のパスを返す（CDPで取得できない場合の_shotの代替手段）"""
         try:
             temp_dir = tempfile.gettempdir()
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -113,7 +520,12 @@ class TwitterBot:
             if self.driver:
                 try:
                     self.driver.save_screenshot(filepath)
-                    if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+                    try:
+                        size = os.stat(filepath).st_size
+                    except FileNotFoundError:
+                        size = 0
+                    if size > 0:
+                        filepath = self._compress_screenshot(filepath)
                         logger.info(f"Screenshot saved: {filepath}")
                         return filepath
                     else:
@@ -129,69 +541,242 @@ class TwitterBot:
             logger.error(f"Failed to save screenshot: {str(e)}")
             return ""
             
-    def _send_notification_email(self, subject: str, body: str, screenshot_paths: list[str], log_file_path: Optional[str] = None):
-        """通知メールを送信"""
+    def _compress_screenshot(self, png_path: str) -> str:
+        """PNGのスクリーンショットを縮小してJPEGに変換し、変換後のパスを返す（失敗時は元のパス）"""
+        jpg_path = os.path.splitext(png_path)[0] + '.jpg'
+        try:
+            data = self._to_jpeg(png_path)
+            with open(jpg_path, 'wb') as f:
+                f.write(data)
+            os.unlink(png_path)
+            # 添付時に読み直さないよう、書き出した内容をそのままキャッシュしておく
+            _cache_attachment(jpg_path, data)
+            return jpg_path
+        except Exception as e:
+            logger.warning(f"Failed to compress screenshot {png_path}: {str(e)}")
+            return png_path
+
+    def _to_jpeg(self, source: Union[str, io.BytesIO]) -> bytes:
+        """スクリーンショット画像を SCREENSHOT_MAX_SIZE に収まるよう縮小し、JPEGデータに変換する"""
+        with Image.open(source) as im:
+            im.thumbnail(SCREENSHOT_MAX_SIZE, Image.LANCZOS)
+            buf = io.BytesIO()
+            im.convert('RGB').save(buf, 'JPEG', quality=SCREENSHOT_JPEG_QUALITY, optimize=True)
+        return buf.getvalue()
+
+    def _save_debug_screenshot(self, step: str) -> Optional[str]:
+        """デバッグ用スクリーンショットを保存（TWITTER_BOT_DEBUG_SHOTS=1 の場合のみ）"""
+        if not self.debug_screenshots:
+            return None
+        screenshot_path = self._shot(step)
+        logger.info(f"Debug screenshot saved ({step}): {screenshot_path}")
+        return screenshot_path
+
+    def _capture_screenshot_bytes(self) -> bytes:
+        """CDPのPage.captureScreenshotでスクリーンショットをメモリ上に取得し、縮小したJPEGデータを返す"""
+        # JPEGの再エンコードで画質が二重に劣化しないよう、取得はPNGで行う
+        result = self.driver.execute_cdp_cmd('Page.captureScreenshot', {'format': 'png'})
+        return self._to_jpeg(io.BytesIO(base64.b64decode(result['data'])))
+
+    def _shot(self, tag: str) -> str:
+        """スクリーンショットを取得し、ログイン・投稿処理中のスクリーンショットとして記録する
+
+        通常はディスクを介さずメモリ上に保持し、CDPでの取得に失敗した場合のみファイルに保存する。
+        記録したスクリーンショットの名前（またはパス）を返す。
+        """
+        if not self.driver:
+            logger.warning("Driver not available for screenshot")
+            return ""
+        # 同じタグのスクリーンショットを直前に取得済みの場合は、取り直さずにそれを使う
+        now = time.monotonic()
+        previous = self._shots.get(tag)
+        if previous and now - self._shot_times.get(tag, 0.0) < SCREENSHOT_MIN_INTERVAL:
+            logger.info(f"Reusing screenshot taken {now - self._shot_times[tag]:.1f}s ago for {tag}")
+            return previous[0] if isinstance(previous, tuple) else previous
+        self._shot_times[tag] = now
+        try:
+            filename = f"twitter_{tag}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+            self._shots[tag] = (filename, self._capture_screenshot_bytes())
+            logger.info(f"Screenshot captured: {filename}")
+            return filename
+        except Exception as e:
+            logger.warning(f"Failed to capture screenshot via CDP, falling back to file: {str(e)}")
+        screenshot_path = self._save_screenshot(tag)
+        self._shots[tag] = screenshot_path
+        return screenshot_path
+
+    def _all_shots(self) -> list[Screenshot]:
+        """記録済みのスクリーンショットのうち、取得に成功したものを返す"""
+        return [shot for shot in self._shots.values() if shot]
+
+    def _send_notification_email(self, subject: str, body: str, screenshot_paths: list[Screenshot], log_file_path: Optional[Union[str, Tuple[str, bytes]]] = None):
+        """通知メールを送信キューに追加する（送信はワーカースレッドが行う）
+
+        log_file_path にはログファイルのパス、または (添付ファイル名, データ) のタプルを渡せる。
+        """
         if not all([self.smtp_email, self.smtp_password, self.notification_email]):
             logger.warning("SMTP credentials not set. Skipping email notification.")
             return
-            
+
+        with self._mail_lock:
+            self._mail_q.put({
+                'subject': subject,
+                'body': body,
+                'screenshot_paths': list(screenshot_paths),
+                'log_file_path': log_file_path,
+            })
+            if self._mail_thread is None:
+                self._mail_thread = threading.Thread(target=self._mail_worker, name="twitter-bot-mail", daemon=True)
+                self._mail_thread.start()
+
+    def _stop_mail_worker(self):
+        """送信待ちのメールを送り終えた後に、SMTP接続を閉じてワーカースレッドを終了するよう依頼する"""
+        with self._mail_lock:
+            if self._mail_thread is not None:
+                self._mail_q.put(None)
+
+    def _mail_worker(self):
+        """送信キューから通知メールを取り出して送信する
+
+        最初のメールを受け取ってから MAIL_BATCH_WINDOW 秒の間に届いたメールは1通にまとめて送る。
+        キューに入ったNoneは、それまでのメールを送り終えた後にSMTP接続を閉じて終了する要求として扱う。
+        """
+        while True:
+            mail = self._mail_q.get()
+            if mail is None:
+                if self._finish_mail_worker():
+                    return
+                continue
+            batch = [mail]
+            stop_after = False
+            deadline = time.monotonic() + MAIL_BATCH_WINDOW
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    mail = self._mail_q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if mail is None:
+                    stop_after = True
+                    break
+                batch.append(mail)
+            try:
+                self._deliver_notification_email(**self._merge_notifications(batch))
+            except Exception as e:
+                logger.error(f"メール通知送信処理で予期せぬエラーが発生: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._mail_q.task_done()
+            if stop_after and self._finish_mail_worker():
+                return
+
+    def _finish_mail_worker(self) -> bool:
+        """終了要求を受けたワーカースレッドでSMTP接続を閉じ、終了してよいか（送信待ちのメールがないか）を返す"""
+        self._close_smtp()
+        with self._mail_lock:
+            self._mail_q.task_done()
+            # 終了要求の後に追加されたメールがあれば、このスレッドで引き続き送信する
+            if self._mail_q.empty():
+                self._mail_thread = None
+                return True
+        return False
+
+    def _merge_notifications(self, batch: list[Dict[str, Any]]) -> Dict[str, Any]:
+        """複数の通知メールを件名・本文・添付ファイルをまとめた1通に統合する"""
+        if len(batch) == 1:
+            return batch[0]
+        subject = f"{batch[0]['subject']} (+{len(batch) - 1} more)"
+        body = "\n\n".join(f"=== {mail['subject']} ===\n{mail['body']}" for mail in batch)
+        # 重複するスクリーンショットは送信時にまとめて除くため、ここでは連結のみ行う
+        screenshot_paths = [path for mail in batch for path in mail['screenshot_paths']]
+        # ログは最も新しいものだけを添付する
+        log_file_path = next((mail['log_file_path'] for mail in reversed(batch) if mail['log_file_path']), None)
+        logger.info(f"Merged {len(batch)} notification emails into one.")
+        return {
+            'subject': subject,
+            'body': body,
+            'screenshot_paths': screenshot_paths,
+            'log_file_path': log_file_path,
+        }
+
+    def _unique_screenshots(self, screenshot_paths: list[Screenshot]) -> list[Screenshot]:
+        """内容が同一のスクリーンショットを除き、最初に現れたものだけを順序を保って返す"""
+        seen = set()
+        unique = []
+        for shot in screenshot_paths:
+            try:
+                if isinstance(shot, tuple):
+                    data = shot[1]
+                else:
+                    # 添付時と同じキャッシュを使い、ファイルの読み込みを1回で済ませる
+                    data = _read_attachment(shot)
+            except OSError:
+                # 読み込めないファイルは判定せずそのまま残し、添付時のチェックに任せる
+                unique.append(shot)
+                continue
+            digest = hashlib.sha256(data).digest()
+            if digest not in seen:
+                seen.add(digest)
+                unique.append(shot)
+        return unique
+
+    def _deliver_notification_email(self, subject: str, body: str, screenshot_paths: list[Screenshot], log_file_path: Optional[Union[str, Tuple[str, bytes]]] = None):
+        """通知メールを組み立てて送信"""
         try:
             logger.info(f"Preparing to send notification email: {subject}")
-            msg = MIMEMultipart()
+            msg = EmailMessage()
             msg['Subject'] = subject
             msg['From'] = self.smtp_email
             msg['To'] = self.notification_email
 
-            msg.attach(MIMEText(body, 'plain'))
+            msg.set_content(body)
 
-            # スクリーンショットを添付
-            for screenshot_path in screenshot_paths:
-                if os.path.exists(screenshot_path):
+            # スクリーンショットを添付（まとめた通知間で同じ内容のものは、送信時に1度だけ判定して除く）
+            for screenshot_path in self._unique_screenshots(screenshot_paths):
+                if isinstance(screenshot_path, tuple):
+                    # メモリ上で取得したスクリーンショットはそのまま添付する
+                    filename, data = screenshot_path
+                    msg.add_attachment(data, maintype='image', subtype='jpeg', filename=filename)
+                    logger.info(f"Successfully attached screenshot: {filename}")
+                else:
                     try:
                         logger.info(f"Attaching screenshot: {screenshot_path}")
-                        if not os.access(screenshot_path, os.R_OK):
-                            logger.error(f"No read permission for screenshot: {screenshot_path}")
-                            continue
-                            
-                        with open(screenshot_path, 'rb') as f:
-                            img = MIMEImage(f.read())
-                            img.add_header('Content-Disposition', 'attachment', filename=os.path.basename(screenshot_path))
-                            msg.attach(img)
-                            logger.info(f"Successfully attached screenshot: {screenshot_path}")
+                        data = _read_attachment(screenshot_path)
+                        subtype = 'jpeg' if screenshot_path.endswith('.jpg') else 'png'
+                        msg.add_attachment(data, maintype='image', subtype=subtype, filename=os.path.basename(screenshot_path))
+                        logger.info(f"Successfully attached screenshot: {screenshot_path}")
+                    except FileNotFoundError:
+                        logger.warning(f"Screenshot file not found: {screenshot_path}")
+                    except PermissionError:
+                        logger.error(f"No read permission for screenshot: {screenshot_path}")
                     except Exception as e:
                         logger.error(f"Failed to attach screenshot {screenshot_path}: {str(e)}")
-                else:
-                    logger.warning(f"Screenshot file not found: {screenshot_path}")
 
-            # ログファイルを添付
-            if log_file_path and os.path.exists(log_file_path):
+            # ログファイルを添付（パスが渡された場合も末尾のみを1度だけ読み込んで圧縮する）
+            if isinstance(log_file_path, str):
+                log_file_path = self._read_log_tail(log_file_path)
+            if log_file_path:
                 try:
-                    log_file_path = os.path.abspath(log_file_path)
-                    logger.info(f"Attempting to attach log file: {log_file_path}")
-                    if os.access(log_file_path, os.R_OK):
-                        with open(log_file_path, 'rb') as f:
-                            part = MIMEApplication(f.read(),_subtype="octet-stream")
-                            part.set_payload((f.read()))
-                            encoders.encode_base64(part)
-                            part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(log_file_path))
-                            msg.attach(part)
-                            logger.info(f"Successfully attached log file: {log_file_path}")
-                    else:
-                        logger.error(f"No read permission for log file: {log_file_path}")
+                    filename, data = log_file_path
+                    msg.add_attachment(data, maintype='application', subtype='gzip', filename=filename)
+                    logger.info(f"Successfully attached log tail: {filename} ({len(data)} bytes)")
                 except Exception as e:
-                    logger.error(f"Failed to attach log file {log_file_path}: {str(e)}")
-            elif log_file_path:
-                 logger.warning(f"Log file not found for attachment: {log_file_path}")
+                    logger.error(f"Failed to attach log tail: {str(e)}")
 
             # メール送信
             try:
-                logger.info("Connecting to SMTP server...")
-                with smtplib.SMTP_SSL('smtp.gmail.com', 465, timeout=30) as smtp:
-                    logger.info("Logging in to SMTP server...")
-                    smtp.login(self.smtp_email, self.smtp_password)
-                    logger.info("Sending email...")
-                    smtp.send_message(msg)
-                    logger.info(f"Notification email sent to {self.notification_email}")
+                logger.info("Sending email...")
+                try:
+                    self._get_smtp().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # キャッシュした接続が切断されていた場合は一度だけ再接続する
+                    logger.warning("SMTP connection was closed. Reconnecting...")
+                    self._smtp = None
+                    self._get_smtp().send_message(msg)
+                self._smtp_last_used = time.monotonic()
+                logger.info(f"Notification email sent to {self.notification_email}")
             except smtplib.SMTPAuthenticationError as e:
                 logger.error("Gmail認証エラー: アプリパスワードが正しく設定されていない可能性があります。")
                 logger.error(f"エラー詳細: {str(e)}")
@@ -204,86 +789,77 @@ class TwitterBot:
         except Exception as e:
             logger.error(f"メール通知送信処理で予期せぬエラーが発生: {str(e)}")
             
+    def _get_smtp(self) -> smtplib.SMTP_SSL:
+        """SMTP接続を取得（生存している接続があれば再利用する）"""
+        if self._smtp is not None:
+            # 直近に使用した接続はそのまま使い、しばらく使っていない場合のみNOOPで生存確認する
+            if time.monotonic() - self._smtp_last_used <= SMTP_IDLE_CHECK:
+                return self._smtp
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp()
+
+        logger.info("Connecting to SMTP server...")
+        smtp = smtplib.SMTP_SSL('smtp.gmail.com', 465, timeout=30)
+        logger.info("Logging in to SMTP server...")
+        smtp.login(self.smtp_email, self.smtp_password)
+        self._smtp = smtp
+        return smtp
+
+    def _close_smtp(self):
+        """キャッシュしているSMTP接続を閉じる"""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        finally:
+            self._smtp = None
+
+    def _navigate(self, url: str):
+        """指定URLへ遷移し、遷移先を記録する"""
+        self.driver.get(url)
+        self._last_url = url
+
+    def _current_url(self) -> str:
+        """現在のURLを返す（ドライバーが応答しない場合は最後に遷移したURLを返す）"""
+        if not self.driver:
+            return self._last_url
+        try:
+            return self.driver.current_url
+        except WebDriverException:
+            return self._last_url
+
     def _wait_for_page_load(self, timeout: int = 30):
-        """ページの読み込みを待機"""
+        """ページのDOMが操作可能になるまで待機（実際の操作対象は各ステップの要素待機で確認する）"""
         try:
             WebDriverWait(self.driver, timeout).until(
-                lambda driver: driver.execute_script('return document.readyState') == 'complete'
+                lambda driver: driver.execute_script('return document.readyState') in ('interactive', 'complete')
             )
         except TimeoutException:
             logger.warning(f"Page load timeout after {timeout} seconds")
             self._check_memory_usage()
-            gc.collect()
             
     def _setup_driver(self):
         """Seleniumドライバーの初期化"""
         try:
-            options = webdriver.ChromeOptions()
-            options.add_argument('--headless=new')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1280,720")
-            options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-            
-            # 自動化検出対策
-            options.add_argument("--disable-blink-features=AutomationControlled")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option("useAutomationExtension", False)
-            
-            # メモリ最適化オプション
-            options.add_argument("--disable-extensions")
-            options.add_argument("--disable-popup-blocking")
-            options.add_argument("--disable-infobars")
-            options.add_argument("--disable-notifications")
-            options.add_argument("--disable-default-apps")
-            options.add_argument("--disable-sync")
-            options.add_argument("--disable-background-networking")
-            options.add_argument("--disable-background-timer-throttling")
-            options.add_argument("--disable-backgrounding_occluded_windows")
-            options.add_argument("--disable-breakpad")
-            options.add_argument("--disable-component-extensions_with_background_pages")
-            options.add_argument("--disable-features=TranslateUI")
-            options.add_argument("--disable-ipc-flooding-protection")
-            options.add_argument("--disable-renderer-backgrounding")
-            options.add_argument("--enable-features=NetworkService,NetworkServiceInProcess")
-            options.add_argument("--force-color-profile=srgb")
-            options.add_argument("--metrics-recording-only")
-            options.add_argument("--no-first-run")
-            options.add_argument("--password-store=basic")
-            options.add_argument("--use-mock-keychain")
+            # 永続セッションモードではプロファイルを保存してクッキーを引き継ぐ
+            options = _build_chrome_options(PROFILE_DIR if self.persistent_session else None)
             
-            # さらなるステルス対策オプション
-            options.add_argument("--disable-features=ChromeWhatsNewUI") # Chromeの新しいUI機能を無効化
-            options.add_argument("--disable-features=ChromeMigrationWindow") # Chromeの移行ウィンドウを無効化
-            options.add_argument("--disable-translate") # 翻訳機能を無効化
-            options.add_argument("--hide-scrollbars") # スクロールバーを隠す
-            options.add_argument("--mute-audio") # 音声をミュート
-            options.add_argument("--no-default-browser-check") # デフォルトブラウザチェックを無効化
-            options.add_argument("--disable-component-update") # コンポーネントアップデートを無効化
-            options.add_argument("--disable-speech-api") # 音声APIを無効化
-            options.add_argument("--disable-webrtc-event-logging") # WebRTCイベントログを無効化
-            options.add_argument("--disable-webrtc-multiple-routes") # WebRTCの複数ルートを無効化
-            options.add_argument("--disable-webrtc-stats-gathering") # WebRTC統計情報収集を無効化
-            
-            # メモリ制限の設定
-            options.add_argument("--js-flags=--max-old-space-size=256")
-            options.add_argument("--memory-pressure-off")
-            options.add_argument("--disable-software-rasterizer")
-            options.add_argument("--disable-dev-tools")
-            options.add_argument("--disable-logging")
-            options.add_argument("--log-level=3")
-            options.add_argument("--silent")
-            
-            # 日本語表示のためのオプション
-            options.add_argument("--lang=ja")
-            options.add_argument("--accept-lang=ja")
-            options.add_argument("--force-device-scale-factor=1")
-            options.add_argument("--high-dpi-support=1")
-            
-            self.driver = webdriver.Chrome(options=options)
-            self.wait = WebDriverWait(self.driver, 60)  # タイムアウトを60秒に短縮
+            # 各WebDriverコマンドで接続を張り直さないよう、keep-aliveを明示して接続を使い回す
+            self.driver = webdriver.Chrome(options=options, keep_alive=True)
+            self._enlarge_driver_pool()
+            self._block_heavy_resources()
+            self.wait = WebDriverWait(self.driver, LOGIN_WAIT_TIMEOUT)
             self.modal_wait = WebDriverWait(self.driver, 3)  # モーダル待機を3秒に短縮
+            # ページ読み込みタイムアウトは遷移前に設定しておく必要があるため、初期化時に一度だけ設定する
+            self.driver.set_page_load_timeout(45)
+            # _wait_for_css の非同期スクリプトが待機途中で打ち切られないよう、スクリプトのタイムアウトを延ばす
+            self.driver.set_script_timeout(CHALLENGE_WAIT_TIMEOUT + 10)
 
             # Selenium-Stealthを適用
             stealth(self.driver,
@@ -310,6 +886,24 @@ class TwitterBot:
             self._send_error_notification("Driver Setup Failed", {'error': str(e)}, [])
             raise
             
+    def _enlarge_driver_pool(self):
+        """chromedriverとの接続プールの保持数を増やし、使い終えた接続が破棄されないようにする"""
+        conn = getattr(self.driver.command_executor, '_conn', None)
+        if conn is None or not hasattr(conn, 'connection_pool_kw'):
+            return
+        # 既存のプール設定（タイムアウト等）は保ったまま、以降に作られるプールの保持数だけを変更する
+        conn.connection_pool_kw['maxsize'] = DRIVER_POOL_MAXSIZE
+        conn.clear()
+
+    def _block_heavy_resources(self):
+        """画像・動画・フォントなどのリソース読み込みをブロックする"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+            logger.info("Blocked heavy resource loading via CDP.")
+        except Exception as e:
+            logger.warning(f"Failed to block resources via CDP: {str(e)}")
+
     def _apply_stealth_script(self):
         """WebDriver検出を回避するためのJavaScriptを実行"""
         try:
@@ -364,370 +958,474 @@ class TwitterBot:
     def _handle_security_modal(self):
         """セキュリティモーダルの処理"""
         try:
-            close_button = self.modal_wait.until(EC.element_to_be_clickable((By.XPATH, '//div[@aria-label="Close"]')))
+            close_button = self.modal_wait.until(EC.element_to_be_clickable(CLOSE_BUTTON_LOC))
             close_button.click()
             logger.info("Security modal closed")
-            self.wait.until(EC.invisibility_of_element_located((By.XPATH, '//div[@aria-label="Close"]')))
+            self.wait.until(EC.invisibility_of_element_located(CLOSE_BUTTON_LOC))
         except TimeoutException:
             logger.info("No security modal detected")
             
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def _login(self):
-        """Twitterにログイン"""
-        try:
-            # 各種スクリーンショットのパスを保持する変数
-            screenshot_initial_load = None
-            screenshot_after_page_load = None
-            screenshot_after_username_input = None
-            screenshot_after_userid_input = None
-            screenshot_after_userid_check_skipped = None
-            screenshot_before_password_wait = None
-            screenshot_before_password = None
-            screenshot_after_password = None
-            screenshot_before_login_click = None
-            screenshot_after_login_click = None
-            
-            logger.info("Attempting to login to Twitter")
-            self.driver.get('https://twitter.com/i/flow/login')
-            
-            # ログインページアクセス直後のスクリーンショット
-            screenshot_initial_load = self._save_screenshot("login_initial_load")
-            logger.info(f"Screenshot saved after initial login page load: {screenshot_initial_load}")
-            self._send_debug_screenshot_email("Initial Page Load", self._collect_screenshots(screenshot_initial_load))
-            
-            self.driver.set_page_load_timeout(60)  # ページ読み込みタイムアウトを60秒に短縮
-            
-            # ページの読み込み完了を待機
-            self._wait_for_page_load(timeout=60)  # ページ読み込み待機も60秒に短縮
-            
-            # ページ読み込み完了後のスクリーンショット
-            screenshot_after_page_load = self._save_screenshot("login_after_page_load")
-            logger.info(f"Screenshot saved after page load wait: {screenshot_after_page_load}")
-            self._send_debug_screenshot_email("After Page Load Wait", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load))
+    def _ensure_logged_in(self) -> bool:
+        """ログイン済み、または保存済みクッキーでログインできればそのまま、それ以外の場合のみ_loginを実行する"""
+        # 同じドライバーで確認済みで、認証クッキーも残っていればホーム画面の確認を省く
+        if self._session_verified and self._has_auth_cookie():
+            logger.info("Reusing verified session. Skipping login check.")
+            return True
+        # プロファイルを持たない新しいドライバーはログイン済みになり得ないため、保存済みクッキーの読み込みから始める
+        if (self.persistent_session or self._driver_reused) and self._is_logged_in():
+            logger.info("Already logged in. Skipping login flow.")
+            self._session_verified = True
+            return True
+        if self._load_cookies(COOKIE_FILE) and self._is_logged_in():
+            logger.info("Logged in with saved cookies. Skipping login flow.")
+            self._session_verified = True
+            return True
 
-            # 描画を促すためにbody要素をクリック
-            try:
-                body_element = self.driver.find_element(By.TAG_NAME, 'body')
-                body_element.click()
-                logger.info("Clicked body element to potentially prompt rendering.")
-                time.sleep(random.uniform(0.5, 1.5))  # 静的待機をランダム化
-            except Exception as e:
-                logger.warning(f"Could not click body element: {str(e)}")
+        logger.info("Not logged in. Starting login flow.")
+        login_successful = self._login()
+        if login_successful:
+            self._save_cookies(COOKIE_FILE)
+        self._session_verified = login_successful
+        return login_successful
 
-            # メモリ使用量のチェック
-            self._check_memory_usage()
-            
-            # クッキーをクリア
-            logger.info("Clearing cookies...")
-            self.driver.delete_all_cookies()
-            
-            # ユーザー名/メールアドレス入力
-            logger.info("Entering username/email...")
-            try:
-                # 要素が表示されるまで待機
-                initial_input = self.wait.until(EC.presence_of_element_located((By.XPATH, '//input[@autocomplete="username"] | //input[@name="text"]')))
-                logger.info("Username/Email input field found.")
-
-                # 人間らしい操作シミュレーション: スクロールとマウス移動
-                self._simulate_human_like_movement(initial_input)
-                time.sleep(random.uniform(0.5, 1.5)) # 操作前の短い待機
-
-                initial_input.clear()
-                # タイピングを人間らしくシミュレーション
-                for char in self.twitter_id:
-                    initial_input.send_keys(char)
-                    time.sleep(random.uniform(0.05, 0.2)) # ランダムな短い遅延
-                # 入力後の静的待機をランダム化
-                time.sleep(random.uniform(1, 3))
-                initial_input.send_keys(Keys.RETURN)
-                logger.info("Entered username/email and pressed RETURN.")
-                
-                screenshot_after_username_input = self._save_screenshot("after_username_input")
-                logger.info(f"Screenshot saved after username input: {screenshot_after_username_input}")
-                self._send_debug_screenshot_email("After Username Input", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input))
+    def _has_auth_cookie(self) -> bool:
+        """ドライバーに認証クッキー（auth_token）が残っているかを確認する"""
+        try:
+            return self.driver.get_cookie('auth_token') is not None
+        except WebDriverException:
+            return False
 
-            except TimeoutException:
-                logger.error("Timeout waiting for username/email input field.")
-                screenshot_path = self._save_screenshot("username_email_timeout")
-                error_info = {
-                    'url': self.driver.current_url if self.driver else "N/A",
-                    'error': "Timeout waiting for username/email input field.",
-                    'screenshot_path': screenshot_path
-                }
-                self._send_error_notification("Username/Email Timeout", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_path), "twitter_bot.log")
-                raise TimeoutException("Timeout waiting for username/email input field.")
-            except Exception as e:
-                 logger.error(f"Error during username/email input: {str(e)}")
-                 screenshot_path = self._save_screenshot("username_input_error")
-                 error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': f"Error during username/email input: {str(e)}", 'screenshot_path': screenshot_path}
-                 self._send_error_notification("Username Input Error", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_path), "twitter_bot.log")
-                 raise
+    def _is_logged_in(self) -> bool:
+        """ホーム画面を開き、ログイン済みの状態かを確認する"""
+        try:
+            self._navigate('https://twitter.com/home')
+            # eagerの読み込みではクライアント側のリダイレクトが遷移直後には終わっていないため、
+            # ログイン画面へのリダイレクトとホーム画面の表示のうち、先に起きた方で判定する
+            WebDriverWait(self.driver, LOGIN_WAIT_TIMEOUT).until(EC.any_of(
+                EC.url_contains('/i/flow/login'),
+                EC.presence_of_element_located(POST_LINK_LOC),
+            ))
+            return '/i/flow/login' not in self.driver.current_url
+        except TimeoutException:
+            return False
 
+    def _save_cookies(self, path: str):
+        """ログイン済みセッションのクッキーをファイルに保存する"""
+        try:
+            # 認証情報を含むため所有者のみ読み書きできる権限で作成する
+            with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                json.dump(self.driver.get_cookies(), f)
+            logger.info(f"Saved session cookies to {path}")
+        except Exception as e:
+            logger.warning(f"Failed to save cookies: {str(e)}")
 
-            # ユーザーID確認（必要な場合）
-            try:
-                logger.info("Checking for user ID verification...")
-                # 要素が表示されるまで待機
-                user_id_input = self.wait.until(EC.presence_of_element_located((By.XPATH, '//input[@name="text" and @data-testid="ocfEnterTextTextInput"]')))
-                logger.info("User ID input field found.")
-
-                # 人間らしい操作シミュレーション: スクロールとマウス移動
-                self._simulate_human_like_movement(user_id_input)
-                time.sleep(random.uniform(0.5, 1.5)) # 操作前の短い待機
-
-                user_id_input.clear()
-                # タイピングを人間らしくシミュレーション
-                for char in self.twitter_user_id:
-                    user_id_input.send_keys(char)
-                    time.sleep(random.uniform(0.05, 0.2)) # ランダムな短い遅延
-                # 入力後の静的待機をランダム化
-                time.sleep(random.uniform(1, 3))
-                user_id_input.send_keys(Keys.RETURN)
-                logger.info("Entered user ID and pressed RETURN.")
-
-                screenshot_after_userid_input = self._save_screenshot("after_userid_input")
-                logger.info(f"Screenshot saved after user ID input: {screenshot_after_userid_input}")
-                self._send_debug_screenshot_email("After User ID Input", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input))
+    def _load_cookies(self, path: str) -> bool:
+        """保存済みのクッキーをブラウザに読み込む。読み込めた場合はTrueを返す"""
+        try:
+            with open(path) as f:
+                cookies = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read saved cookies: {str(e)}")
+            return False
 
-            except TimeoutException:
-                logger.info("No user ID verification required or field not found within timeout.")
-                screenshot_after_userid_check_skipped = self._save_screenshot("after_userid_check_skipped")
-                logger.info(f"Screenshot saved after user ID check skipped: {screenshot_after_userid_check_skipped}")
-                self._send_debug_screenshot_email("After User ID Check Skipped", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_check_skipped))
-            except Exception as e:
-                 logger.error(f"Error during user ID input: {str(e)}")
-                 screenshot_path = self._save_screenshot("userid_input_error")
-                 error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': f"Error during user ID input: {str(e)}", 'screenshot_path': screenshot_path}
-                 self._send_error_notification("User ID Input Error", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_path), "twitter_bot.log")
-                 raise
+        # クッキーは同じドメインのページを開いた状態でしか追加できない
+        self._navigate('https://twitter.com')
+        loaded = 0
+        for cookie in cookies:
+            try:
+                self.driver.add_cookie(cookie)
+                loaded += 1
+            except WebDriverException as e:
+                logger.debug(f"Skipped cookie {cookie.get('name')}: {str(e)}")
+        logger.info(f"Loaded {loaded} saved cookies from {path}")
+        return loaded > 0
+
+    # 最後の試行の例外をRetryErrorで包まずに送出し、_ui_stepで通知済みの例外かを呼び出し元で判定できるようにする
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), reraise=True)
+    def _login(self):
+        """Twitterにログイン"""
+        self._shots = {}
+        try:
+            logger.info("Attempting to login to Twitter")
+            self._open_login_page()
+            self._safe_step("Username/Email Input", "username_input", self._enter_username)
+            screen_shown = self._safe_step("User ID Input", "userid_input", self._enter_user_id)
+            # ユーザーID確認画面・パスワード画面のどちらも表示されなかった場合は、以降の待機を短くする
+            step_timeout = LOGIN_WAIT_TIMEOUT if screen_shown else LOGIN_RECHECK_TIMEOUT
 
             # パスワード入力
             logger.info("Entering password...")
-            
-            # ユーザーID入力後の画面遷移とページ読み込み完了を待機
-            self._wait_for_page_load(timeout=30)
-            logger.info("Page loaded after User ID submission (if applicable).")
-            # 静的待機をランダム化
-            time.sleep(random.uniform(1, 3))
-            logger.info("Finished short random static wait after user ID submission.")
-
-            # エラーモーダルが表示されていないかチェックし、表示されていれば閉じる
-            try:
-                logger.info("Checking for error modal...")
-                # エラーモーダル内のOKボタンまたは閉じるボタンを短いタイムアウトで待機
-                error_ok_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, '//button[.//span[text()="OK"]] | //div[@aria-label="Close"]'))
-                )
-                logger.warning("Error modal detected. Attempting to close.")
-                error_ok_button.click()
-                # モーダルが閉じるまで待機
-                WebDriverWait(self.driver, 5).until(
-                    EC.invisibility_of_element_located((By.XPATH, '//button[.//span[text()="OK"]] | //div[@aria-label="Close"]'))
-                )
-                logger.info("Error modal closed successfully.")
-                # モーダルを閉じた後に少し待機
-                time.sleep(random.uniform(1, 3))
+            # ユーザーID入力後の画面遷移を待ち、エラーモーダルが表示されていれば閉じる
+            self._dismiss_error_modal(step_timeout)
+            if self._is_redirected_to_homepage():
+                return False # ログイン失敗を示すFalseを返す
 
-            except TimeoutException:
-                logger.info("No error modal detected or could not close within timeout.")
-            except Exception as e:
-                logger.error(f"An error occurred while handling error modal: {str(e)}")
-                # エラーモーダルの処理中にエラーが発生した場合もスクリーンショットと通知
-                screenshot_path = self._save_screenshot("error_modal_handling_error")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': f"Error handling modal: {str(e)}", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Error Modal Handling Failed", error_info, self._collect_screenshots(screenshot_path), "twitter_bot.log")
-
-
-            # エラーモーダル処理後、現在のURLを確認
-            current_url_after_modal = self.driver.current_url if self.driver else "N/A"
-            logger.info(f"Current URL after error modal check: {current_url_after_modal}")
-
-            # トップページに戻されたかチェックし、その場合は早期終了
-            if current_url_after_modal.rstrip('/') == 'https://x.com': # スラッシュの有無を考慮
-                logger.error("Redirected to Twitter homepage after username input. Login failed, likely detected as bot.")
-                # この時点のスクリーンショットとページソースをログに出力してデバッグに役立てる
-                screenshot_path = self._save_screenshot("redirect_to_homepage")
-                page_source = ""
-                try:
-                    page_source = self.driver.page_source
-                except Exception as source_e:
-                    logger.error(f"Failed to get page source after redirect: {str(source_e)}")
+            self._safe_step("Password Input", "password_input", lambda: self._enter_password(step_timeout))
+            return self._safe_step("Login Completion", "login_completion", self._wait_for_login_completion)
 
-                logger.error(f"Current URL: {current_url_after_modal}")
-                logger.error(f"Page Source:\n{page_source[:1000]}...") # 長すぎないように一部を出力
+        except Exception as e:
+            logger.error(f"Login failed: {str(e)}")
+            if e is self._reported_error:
+                # 失敗したステップで通知済みのため、ここでは再送出のみ行う
+                raise
+            self._check_memory_usage()
+            screenshot_path = self._shot("login_general_error")
+            if screenshot_path:
+                logger.info(f"Login error screenshot saved: {screenshot_path}")
+            current_url = self._current_url()
+            logger.error(f"Login failed at URL: {current_url}")
+            
+            error_info = {
+                'url': current_url,
+                'error': str(e),
+                'screenshot_path': screenshot_path
+            }
+            self._send_error_notification("Login Failed", error_info, self._all_shots(), "twitter_bot.log")
 
-                error_info = {
-                    'url': current_url_after_modal,
-                    'error': "Redirected to homepage after username/ID input. Likely bot detection.",
-                    'screenshot_path': screenshot_path
-                }
-                # これまでのスクリーンショットと合わせてエラー通知
-                self._send_error_notification("Login Redirect Failed", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_before_login_click, screenshot_after_login_click, screenshot_path), "twitter_bot.log")
-                return False # ログイン失敗を示すFalseを返す
+            raise
+        finally:
+            # 例外のトレースバック等に残ったWebElement参照を、メモリが増えている場合に解放する
+            self._maybe_collect()
 
+    @contextlib.contextmanager
+    def _ui_step(self, label: str, tag: str, reraise: bool = True):
+        """ブラウザ操作の1ステップを囲み、失敗時はスクリーンショットとエラー通知を行って例外を再送出する
 
-            screenshot_before_password_wait = self._save_screenshot("before_password_wait")
-            logger.info(f"Screenshot saved before password input field wait: {screenshot_before_password_wait}")
+        reraise=False の場合は通知のみ行い、例外を握りつぶして処理を続行する。
+        """
+        try:
+            yield
+        except Exception as e:
+            if isinstance(e, TimeoutException):
+                kind = "Timeout"
+            elif isinstance(e, NoSuchElementException):
+                kind = "Not Found"
+            else:
+                kind = "Error"
+            logger.error(f"{label} {kind}: {str(e)}")
+            screenshot_path = self._shot(f"{tag}_{kind.lower().replace(' ', '_')}")
+            current_url = self._current_url()
+            if isinstance(e, TimeoutException):
+                # タイムアウト時はページソースの一部もログに出力してデバッグに役立てる
+                try:
+                    logger.error(f"Page Source:\n{self.driver.page_source[:1000]}...")
+                except Exception as source_e:
+                    logger.error(f"Failed to get page source: {str(source_e)}")
+            error_info = {
+                'url': current_url,
+                'error': f"{label} failed: {str(e)}",
+                'screenshot_path': screenshot_path
+            }
+            self._send_error_notification(f"{label} {kind}", error_info, self._all_shots(), "twitter_bot.log")
+            # 呼び出し元の例外処理で、同じ失敗のスクリーンショット・通知を重ねて行わないよう記録する
+            self._reported_error = e
+            if reraise:
+                raise
 
+    def _retry_stale(self, label: str, fn):
+        """要素の取得から操作までをfnとして実行し、再描画で要素が無効になった場合は取得し直して再試行する"""
+        for attempt in range(1, STALE_RETRY_ATTEMPTS + 1):
             try:
-                # パスワード入力フィールドがクリック可能になるまで待機 (タイムアウトは長めに設定)
-                password_input = WebDriverWait(self.driver, 90).until(
-                    EC.element_to_be_clickable((By.XPATH, '//input[@name="password"]'))
-                )
-                logger.info("Password input field found and is clickable.")
+                return fn()
+            except StaleElementReferenceException:
+                if attempt == STALE_RETRY_ATTEMPTS:
+                    raise
+                logger.warning(f"{label}: element went stale, retrying ({attempt}/{STALE_RETRY_ATTEMPTS})")
 
-                # 人間らしい操作シミュレーション: スクロールとマウス移動
-                self._simulate_human_like_movement(password_input)
-                time.sleep(random.uniform(0.5, 1.5)) # 操作前の短い待機
+    def _safe_step(self, label: str, tag: str, fn):
+        """ログインの1ステップを実行し、失敗時はスクリーンショットとエラー通知を行って例外を再送出する"""
+        with self._ui_step(label, tag):
+            return fn()
 
-                screenshot_before_password = self._save_screenshot("before_password_input")
-                logger.info(f"Screenshot saved before password input: {screenshot_before_password}")
-                self._send_debug_screenshot_email("Before Password Input", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password))
+    def _debug_step(self, tag: str, step_name: str):
+        """デバッグ用スクリーンショットを取得し、ここまでのスクリーンショットと合わせてデバッグメールを送る"""
+        self._save_debug_screenshot(tag)
+        self._send_debug_screenshot_email(step_name, self._all_shots())
 
-                password_input.click()
-                logger.info("Password input field clicked.")
+    def _open_login_page(self):
+        """ログインページを開き、入力可能な状態にする"""
+        # 直前のログイン確認や保存済みクッキーで残ったセッションは、ログインページを開く前にクリアする
+        # （開いた後にクリアするとログインページ自身が発行したクッキーまで消えてしまう）
+        logger.info("Clearing cookies...")
+        self.driver.delete_all_cookies()
 
-                # タイピングを人間らしくシミュレーション
-                actions = ActionChains(self.driver)
-                for char in self.twitter_password:
-                     actions.send_keys(char)
-                     actions.pause(random.uniform(0.05, 0.2)) # ランダムな短い遅延
-                actions.perform()
-                logger.info("Password entered via ActionChains with human-like typing.")
+        self._navigate('https://twitter.com/i/flow/login')
+        self._debug_step("login_initial_load", "Initial Page Load")
 
-                screenshot_after_password = self._save_screenshot("after_password_input")
-                logger.info(f"Screenshot saved after password input: {screenshot_after_password}")
-                self._send_debug_screenshot_email("After Password Input", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password))
+        # ページの読み込み完了を待機
+        self._wait_for_page_load(timeout=LOGIN_WAIT_TIMEOUT)
+        self._debug_step("login_after_page_load", "After Page Load Wait")
 
-                # 静的待機をランダム化
-                time.sleep(random.uniform(1, 3))
-                logger.info("Finished random static wait after password input.")
+        # 描画を促すためにbody要素をクリック
+        try:
+            body_element = self.driver.find_element(*BODY_LOC)
+            body_element.click()
+            logger.info("Clicked body element to potentially prompt rendering.")
+        except Exception as e:
+            logger.warning(f"Could not click body element: {str(e)}")
 
-                screenshot_before_login_click = self._save_screenshot("before_login_click")
-                logger.info(f"Screenshot saved before login click: {screenshot_before_login_click}")
-                self._send_debug_screenshot_email("Before Login Click", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_before_login_click))
+        # メモリ使用量のチェック
+        self._check_memory_usage()
 
-                # ログインボタン（ENTER）押下前に人間らしい操作シミュレーション
-                # ここでは要素へのマウス移動は不要かもしれないが、カーソルがPasswordFieldにあるため
-                # 必要に応じてランダムな短い遅延などを挟む
-                time.sleep(random.uniform(0.5, 1.5))
+    def _enter_username(self):
+        """ユーザー名/メールアドレスを入力"""
+        logger.info("Entering username/email...")
+        initial_input = self.wait.until(EC.presence_of_element_located(USERNAME_LOC))
+        logger.info("Username/Email input field found.")
 
-                password_input.send_keys(Keys.RETURN)
-                logger.info("Pressed RETURN on password input field (attempting login).\n")
+        # 人間らしい操作シミュレーション: スクロールとマウス移動
+        self._simulate_human_like_movement(initial_input)
 
-                # 静的待機をランダム化
-                time.sleep(random.uniform(1, 3))
-                logger.info("Finished short random static wait after login attempt.")
+        self._js_fill(initial_input, self.twitter_id)
+        initial_input.send_keys(Keys.RETURN)
+        logger.info("Entered username/email and pressed RETURN.")
+        # 次の入力画面に切り替わる（入力欄が置き換わる）まで待機
+        self._wait_for_staleness(initial_input)
+        self._debug_step("after_username_input", "After Username Input")
 
-                screenshot_after_login_click = self._save_screenshot("after_login_click")
-                logger.info(f"Screenshot saved after login click: {screenshot_after_login_click}")
-                self._send_debug_screenshot_email("After Login Click", self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_before_login_click, screenshot_after_login_click))
+    def _enter_user_id(self) -> bool:
+        """ユーザーIDを入力（確認画面が表示された場合のみ）
 
-            except TimeoutException:
-                logger.error("Timeout waiting for password input field.")
-                screenshot_path = self._save_screenshot("password_input_timeout")
-                # エラー時のURLとページソースもログに出力
-                current_url = self.driver.current_url if self.driver else "N/A"
-                page_source = ""
-                try:
-                    page_source = self.driver.page_source
-                except Exception as source_e:
-                    logger.error(f"Failed to get page source: {str(source_e)}")
-                    
-                logger.error(f"Current URL: {current_url}")
-                logger.error(f"Page Source:\n{page_source[:1000]}...") # ソースが長い可能性があるので最初の1000文字程度に制限
-
-                error_info = {
-                    'url': current_url,
-                    'error': "Timeout waiting for password input field.",
-                    'screenshot_path': screenshot_path
-                }
-                self._send_error_notification("Password Input Timeout", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_before_login_click, screenshot_after_login_click, screenshot_path), "twitter_bot.log")
-                raise TimeoutException("Timeout waiting for password input field.")
-            except Exception as e:
-                logger.error(f"Error during password input: {str(e)}")
-                screenshot_path = self._save_screenshot("password_input_error")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': f"Error during password input: {str(e)}", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Password Input Error", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_path), "twitter_bot.log")
-                raise
-
-
-            # ログイン完了の待機
-            logger.info("Waiting for login completion or confirmation code screen...")
-            login_successful = False
+        ユーザーID確認画面とパスワード画面のどちらも表示されなかった場合はFalseを返す。
+        """
+        logger.info("Checking for user ID verification...")
+        try:
+            # ユーザーID確認画面とパスワード入力画面のうち、先に表示された方で分岐する
+            # （確認画面が出ない場合にタイムアウトまで待たない）
+            self.wait.until(EC.any_of(
+                EC.presence_of_element_located(USER_ID_LOC),
+                EC.presence_of_element_located(PASSWORD_LOC),
+            ))
+            user_id_inputs = self.driver.find_elements(*USER_ID_LOC)
+        except TimeoutException:
+            logger.warning(f"Neither user ID nor password screen appeared within {LOGIN_WAIT_TIMEOUT} seconds.")
+            self._debug_step("after_userid_check_timeout", "After User ID Check Timeout")
+            return False
+        if not user_id_inputs:
+            logger.info("No user ID verification required.")
+            self._debug_step("after_userid_check_skipped", "After User ID Check Skipped")
+            return True
+        user_id_input = user_id_inputs[0]
+        logger.info("User ID input field found.")
+
+        # 人間らしい操作シミュレーション: スクロールとマウス移動
+        self._simulate_human_like_movement(user_id_input)
+
+        self._js_fill(user_id_input, self.twitter_user_id)
+        user_id_input.send_keys(Keys.RETURN)
+        logger.info("Entered user ID and pressed RETURN.")
+        self._wait_for_staleness(user_id_input)
+        self._debug_step("after_userid_input", "After User ID Input")
+        return True
+
+    def _dismiss_error_modal(self, timeout: int = LOGIN_WAIT_TIMEOUT):
+        """エラーモーダルが表示されていれば閉じる（処理中のエラーは通知のみ行い、ログインは続行する）"""
+        with self._ui_step("Error Modal Handling", "error_modal_handling", reraise=False):
             try:
-                # 認証コード入力フィールドがクリック可能になるか待機
-                logger.info("Waiting for confirmation code input field to be clickable...")
-                confirmation_code_input_field = self.wait.until(
-                    EC.element_to_be_clickable((By.XPATH, '//input[@name="email_code"] | //input[@autocomplete="one-time-code"] | //input[@data-testid="ocfEnterTextTextInput"]'))
+                logger.info("Checking for error modal...")
+                # パスワード入力欄とエラーモーダル（OKボタンまたは閉じるボタン）のうち先に表示された方を待ち、
+                # モーダルが表示された場合のみ閉じる（モーダルが出ない通常時に固定のタイムアウトを待たない）
+                WebDriverWait(self.driver, timeout).until(EC.any_of(
+                    EC.presence_of_element_located(PASSWORD_LOC),
+                    EC.element_to_be_clickable(ERROR_MODAL_BUTTON_LOC),
+                ))
+                error_buttons = self.driver.find_elements(*ERROR_MODAL_BUTTON_LOC)
+                if not error_buttons:
+                    logger.info("No error modal detected.")
+                    return
+                error_ok_button = error_buttons[0]
+                logger.warning("Error modal detected. Attempting to close.")
+                error_ok_button.click()
+                # モーダルが閉じるまで待機
+                WebDriverWait(self.driver, 5).until(
+                    EC.invisibility_of_element_located(ERROR_MODAL_BUTTON_LOC)
                 )
-                logger.info("Confirmation code input field found and is clickable.")
+                logger.info("Error modal closed successfully.")
+            except TimeoutException:
+                logger.info("No error modal detected or could not close within timeout.")
 
-                # 認証コード処理
-                confirmation_code = self._get_twitter_confirmation_code()
-                if confirmation_code:
-                    logger.info(f"Retrieved confirmation code: {confirmation_code}")
-                    # 認証コード入力処理
-                    # ... 既存の認証コード処理コード ...
+    def _is_redirected_to_homepage(self) -> bool:
+        """ユーザー名入力後にトップページへ戻された（bot判定された）かを確認"""
+        current_url_after_modal = self._current_url()
+        logger.info(f"Current URL after error modal check: {current_url_after_modal}")
 
+        if current_url_after_modal.rstrip('/') != 'https://x.com': # スラッシュの有無を考慮
+            return False
 
-            except TimeoutException:
-                # 認証コード入力フィールドが見つからなかった場合、ログイン成功要素が出現するか待機
-                logger.info("Confirmation code input field not found within timeout. Waiting for standard login completion elements...")
-                try:
-                    # ログイン成功要素が表示されるまで待機
-                    self.wait.until(
-                        EC.presence_of_element_located((By.XPATH, '//div[@data-testid="tweetTextarea_0"] | //div[@aria-label="Home timeline"] | //a[@data-testid="AppTabBar_Home_Link"]'))
-                    )
-                    logger.info("Standard login completion elements found.")
-                    login_successful = True
-                except TimeoutException:
-                    logger.error("Timeout waiting for standard login completion elements.")
-                    # ログイン完了要素が見つからなかった場合もエラーとして扱う
-                    screenshot_path = self._save_screenshot("login_completion_timeout")
-                    error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': "Timeout waiting for standard login completion elements.", 'screenshot_path': screenshot_path}
-                    self._send_error_notification("Login Completion Timeout", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_before_login_click, screenshot_after_login_click, screenshot_path), "twitter_bot.log")
-                    raise TimeoutException("Timeout waiting for standard login completion elements.")
-                except Exception as e:
-                    logger.error(f"Error waiting for login completion elements: {str(e)}")
-                    screenshot_path = self._save_screenshot("login_completion_error")
-                    error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': f"Error waiting for login completion elements: {str(e)}", 'screenshot_path': screenshot_path}
-                    self._send_error_notification("Login Completion Error", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_before_login_click, screenshot_after_login_click, screenshot_path), "twitter_bot.log")
-                    raise
+        logger.error("Redirected to Twitter homepage after username input. Login failed, likely detected as bot.")
+        # この時点のスクリーンショットとページソースをログに出力してデバッグに役立てる
+        screenshot_path = self._shot("redirect_to_homepage")
+        page_source = ""
+        try:
+            page_source = self.driver.page_source
+        except Exception as source_e:
+            logger.error(f"Failed to get page source after redirect: {str(source_e)}")
+
+        logger.error(f"Current URL: {current_url_after_modal}")
+        logger.error(f"Page Source:\n{page_source[:1000]}...") # 長すぎないように一部を出力
+
+        error_info = {
+            'url': current_url_after_modal,
+            'error': "Redirected to homepage after username/ID input. Likely bot detection.",
+            'screenshot_path': screenshot_path
+        }
+        # これまでのスクリーンショットと合わせてエラー通知
+        self._send_error_notification("Login Redirect Failed", error_info, self._all_shots(), "twitter_bot.log")
+        return True
+
+    def _enter_password(self, timeout: int = LOGIN_WAIT_TIMEOUT):
+        """パスワードを入力してログインを実行"""
+        # 以前に届いた認証コードメールを除外できるよう、パスワード送信前の最新メールを並行して記録しておく
+        # 前回の試行の取得処理が残っていれば中止させ、今回の基準の記録を待たせないようにする
+        self._code_cancel.set()
+        self._code_future = None
+        self._code_cancel = threading.Event()
+        baseline = self._submit_code_task(self._record_code_baseline)
+        self._debug_step("before_password_wait", "Before Password Wait")
+
+        # パスワード入力フィールドがクリック可能になるまで待機
+        password_input = WebDriverWait(self.driver, timeout).until(
+            EC.element_to_be_clickable(PASSWORD_LOC)
+        )
+        logger.info("Password input field found and is clickable.")
+
+        # 人間らしい操作シミュレーション: スクロールとマウス移動
+        self._simulate_human_like_movement(password_input)
+        self._debug_step("before_password_input", "Before Password Input")
+
+        self._js_fill(password_input, self.twitter_password)
+        logger.info("Password entered.")
+        self._debug_step("after_password_input", "After Password Input")
 
-            return login_successful
-            
-        except Exception as e:
-            logger.error(f"Login failed: {str(e)}")
-            self._check_memory_usage()
-            screenshot_path = self._save_screenshot("login_general_error")
-            if screenshot_path:
-                logger.info(f"Login error screenshot saved: {screenshot_path}")
-            current_url = self.driver.current_url if self.driver else "N/A"
-            logger.error(f"Login failed at URL: {current_url}")
-            
-            error_info = {
-                'url': current_url,
-                'error': str(e),
-                'screenshot_path': screenshot_path
-            }
-            self._send_error_notification("Login Failed", error_info, self._collect_screenshots(screenshot_initial_load, screenshot_after_page_load, screenshot_after_username_input, screenshot_after_userid_input if 'screenshot_after_userid_input' in locals() else (screenshot_after_userid_check_skipped if 'screenshot_after_userid_check_skipped' in locals() else None), screenshot_before_password_wait, screenshot_before_password, screenshot_after_password, screenshot_before_login_click, screenshot_after_login_click, screenshot_path), "twitter_bot.log")
+        try:
+            baseline.result(timeout=LOGIN_WAIT_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            logger.warning("Timed out recording the confirmation email baseline.")
+        self._code_after = int(time.time())
+        password_input.send_keys(Keys.RETURN)
+        logger.info("Pressed RETURN on password input field (attempting login).\n")
+        # 認証コード画面の表示を待つ間に、並行してメールから認証コードの取得を始める
+        self._code_future = self._submit_code_task(self._get_twitter_confirmation_code, self._code_cancel)
+
+        # ホーム画面への遷移、またはパスワード画面から次の画面への切り替わりを待機
+        try:
+            WebDriverWait(self.driver, 10).until(EC.any_of(
+                EC.url_contains('/home'),
+                EC.staleness_of(password_input),
+            ))
+        except TimeoutException:
+            logger.info("Page did not change within 10 seconds after login attempt.")
+        self._debug_step("after_login_click", "After Login Click")
+
+    def _wait_for_login_completion(self) -> bool:
+        """ログイン完了、または認証コード入力画面の表示を待機"""
+        logger.info("Waiting for login completion or confirmation code screen...")
+        # 認証コード入力フィールドとログイン完了要素のうち、先に現れた方を1回の待機で待つ
+        selector = f"{CODE_LOC[1]}, {LOGIN_DONE_LOC[1]}"
+        try:
+            self._wait_for_css(selector, LOGIN_WAIT_TIMEOUT)
+        except TimeoutException:
+            # CAPTCHA等のチャレンジが表示されている場合のみ、待機時間を延長する
+            if not self.driver.find_elements(*CHALLENGE_LOC):
+                raise
+            logger.warning(f"Login challenge detected. Extending wait to {CHALLENGE_WAIT_TIMEOUT} seconds...")
+            self._wait_for_css(selector, CHALLENGE_WAIT_TIMEOUT)
+
+        if self.driver.find_elements(*CODE_LOC):
+            logger.info("Confirmation code input field found.")
+
+            # 認証コード処理（パスワード送信直後に開始した取得処理の結果を待つ）
+            confirmation_code = self._wait_for_confirmation_code()
+            if confirmation_code:
+                logger.info(f"Retrieved confirmation code: {confirmation_code}")
+                # 認証コード入力処理
+                # ... 既存の認証コード処理コード ...
+            return False
 
+        logger.info("Standard login completion elements found.")
+        # 認証コードは不要だったため、実行中のメールのポーリングを中止させる
+        self._code_cancel.set()
+        self._code_future = None
+        return True
+
+    def _submit_code_task(self, fn, *args) -> concurrent.futures.Future:
+        """認証コード取得用のスレッドで処理を実行する（スレッドは初回のみ起動する）"""
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="twitter-bot-imap")
+        return self._executor.submit(fn, *args)
+
+    def _stop_code_retrieval(self):
+        """実行中の認証コード取得を中止させ、終了するまで待ってからスレッドを停止する"""
+        self._code_cancel.set()
+        self._code_future = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _wait_for_confirmation_code(self, timeout: int = 60) -> Optional[str]:
+        """バックグラウンドで取得中の認証コードを待つ（未開始の場合はその場で取得する）"""
+        future, self._code_future = self._code_future, None
+        if future is None:
+            return self._get_twitter_confirmation_code(self._code_cancel)
+        try:
+            code = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            logger.error(f"Timed out waiting {timeout} seconds for confirmation code retrieval.")
+            self._code_cancel.set()
+            return None
+        if code is None:
+            # 先行取得の時点でメールが未着だった場合に備え、少し待ってから1度だけ取り直す
+            logger.info("Prefetched confirmation code was empty. Retrying retrieval once...")
+            time.sleep(IMAP_POLL_INTERVAL)
+            try:
+                code = self._submit_code_task(self._get_twitter_confirmation_code, self._code_cancel).result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                logger.error(f"Timed out waiting {timeout} seconds for confirmation code retrieval.")
+                self._code_cancel.set()
+                return None
+        return code
+
+    def _wait_for_css(self, css: str, timeout: int, clickable: bool = False):
+        """CSSセレクタに一致する要素をMutationObserverで待ち、見つかった要素を返す"""
+        try:
+            element = self.driver.execute_async_script(_JS_WAIT_FOR_SCRIPT, css, clickable, timeout * 1000)
+        except TimeoutException:
             raise
+        except WebDriverException as e:
+            # 待機中のページ遷移などでスクリプトが中断された場合は、通常のポーリングで待ち直す
+            logger.warning(f"Observer wait for {css} was interrupted, falling back to polling: {str(e)}")
+            condition = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+            return WebDriverWait(self.driver, timeout).until(condition((By.CSS_SELECTOR, css)))
+        if element is None:
+            raise TimeoutException(f"Timed out after {timeout} seconds waiting for {css}")
+        return element
+
+    def _wait_for_staleness(self, element, timeout: int = 10):
+        """要素がDOMから外れる（画面が次のステップに切り替わる）まで待機"""
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.staleness_of(element))
+        except TimeoutException:
+            # 同じ入力欄が再利用される画面もあるため、後続の要素待機に任せる
+            logger.info(f"Element did not go stale within {timeout} seconds.")
 
+    def _js_fill(self, element, value: str):
+        """入力欄へのフォーカス・値設定・inputイベント発火を1回のWebDriverコマンドで行う"""
+        self.driver.execute_script(_JS_FILL_SCRIPT, element, value)
 
     def _simulate_human_like_movement(self, element):
         """要素周辺へのスクロールとマウス移動をシミュレーション"""
         try:
-            # 要素がビューポート内に確実に入るようにスクロール
-            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-            time.sleep(random.uniform(0.5, 1.5)) # スクロール後の待機
+            # 要素がビューポート内に確実に入るようにスクロール（即時スクロールのため完了待ちは不要）
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
 
             # 要素の中央に向けてマウスを移動させるシミュレーション
+            # 移動後の短いゆらぎも同じアクションに含め、1回の呼び出しで実行する
             actions = ActionChains(self.driver)
             actions.move_to_element(element)
+            actions.pause(random.uniform(0.05, 0.15))
             actions.perform()
-            time.sleep(random.uniform(0.5, 1.0)) # マウス移動後の待機
 
         except Exception as e:
             logger.warning(f"Failed to simulate human-like movement for element: {str(e)}")
@@ -735,10 +1433,10 @@ class TwitterBot:
 
 
     # デバッグ用：各ステップのスクリーンショットをメール送信するヘルパー関数を追加
-    def _send_debug_screenshot_email(self, step_name: str, screenshot_paths: list[str]):
+    def _send_debug_screenshot_email(self, step_name: str, screenshot_paths: list[Screenshot]):
         """デバッグ用に特定のステップ完了時のスクリーンショットをメール送信"""
         # デバッグモードが有効な場合のみメール送信
-        if not os.getenv("DEBUG_MODE", "false").lower() == "true":
+        if not self.debug_screenshots or not os.getenv("DEBUG_MODE", "false").lower() == "true":
             return
         
         if not screenshot_paths:
@@ -749,18 +1447,40 @@ class TwitterBot:
         latest_screenshot = screenshot_paths[-1]
         subject = f'Twitter Bot Debug Screenshot: {step_name}'
         body = f'{step_name} 完了時の画面スクリーンショットです。'
-        self._send_notification_email(subject, body, [latest_screenshot])
-        logger.info(f"Debug screenshot email sent for step: {step_name}")
+        self._queue_notification(subject, body, [latest_screenshot])
+        logger.info(f"Debug screenshot queued for step: {step_name}")
+
+    def _read_log_tail(self, log_file_path: str, size: int = LOG_TAIL_BYTES) -> Optional[Tuple[str, bytes]]:
+        """ログファイルの末尾を読み込み、gzip圧縮した添付用データを返す"""
+        # ログはバックグラウンドのスレッドで書き込まれるため、キューに残っている分が書き出されるまで待つ
+        _log_queue.join()
+        try:
+            with open(log_file_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - size))
+                tail = f.read()
+        except OSError as e:
+            logger.warning(f"Failed to read log tail {log_file_path}: {str(e)}")
+            return None
+        filename = f"{os.path.splitext(os.path.basename(log_file_path))[0]}_tail.log.gz"
+        return filename, gzip.compress(tail)
+
+    def _is_duplicate_alert(self, subject: str, detail: str) -> bool:
+        """同じ件名・エラー内容の通知を ALERT_DEDUP_TTL 秒以内に送信済みかを判定し、未送信なら記録する"""
+        key = hashlib.blake2b((subject + detail[:200]).encode(), digest_size=8).hexdigest()
+        now = time.time()
+        if now - self._alert_cache.get(key, 0) < ALERT_DEDUP_TTL:
+            return True
+        self._alert_cache[key] = now
+        return False
 
-    # スクリーンショットパスをリストにまとめるヘルパー関数
-    def _collect_screenshots(self, *args):
-        """Noneでないスクリーンショットパスをリストにして返す"""
-        return [path for path in args if path]
-            
     # エラー通知用のラッパーメソッド
-    def _send_error_notification(self, error_type: str, error_info: Dict[str, Any], screenshot_paths: list[str], log_file_path: Optional[str] = None):
+    def _send_error_notification(self, error_type: str, error_info: Dict[str, Any], screenshot_paths: list[Screenshot], log_file_path: Optional[str] = None):
         """エラー通知メールを送信するためのラッパー"""
         subject = f'Twitter Bot Error: {error_type}'
+        if self._is_duplicate_alert(subject, str(error_info.get('error', ''))):
+            logger.info(f"Suppressed duplicate error notification: {subject}")
+            return
         body = f"""
 エラーが発生しました。
 
@@ -768,251 +1488,326 @@ class TwitterBot:
 発生時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 URL: {error_info.get('url', 'N/A')}
 エラー詳細: {error_info.get('error', 'N/A')}
-メモリ使用量: {psutil.Process(os.getpid()).memory_percent():.1f}%
+メモリ使用量: {self._rss_mb():.1f} MB
 """
-        # 渡されたスクリーンショットパスをそのまま使用
-        self._send_notification_email(subject, body, screenshot_paths, log_file_path)
+        self._queue_notification(subject, body, screenshot_paths, log_file_path)
+
+    def _queue_notification(self, subject: str, body: str, screenshot_paths: list[Screenshot], log_file_path: Optional[str] = None):
+        """通知をすぐには送らず、実行の終わりに _flush_notifications でまとめて送るために溜めておく
+
+        ログは通知ごとに読まず、送信時に1度だけ末尾を読み込む。
+        """
+        self._pending_notifications.append({
+            'subject': subject,
+            'body': body,
+            'screenshot_paths': list(screenshot_paths),
+            'log_file_path': log_file_path,
+        })
+
+    def _flush_notifications(self):
+        """溜めておいた通知を1通の実行レポートにまとめて送信キューに追加する"""
+        if not self._pending_notifications:
+            return
+        batch, self._pending_notifications = self._pending_notifications, []
+        report = self._merge_notifications(batch)
+        if len(batch) > 1:
+            report['subject'] = f"Twitter Bot Run Report: {len(batch)} notifications"
+        # ログはファイル全体ではなく末尾のみを圧縮して、レポート全体で1つだけ添付する
+        # （末尾の読み込みは、直前のログが書き出されるのを待てるワーカースレッドで送信時に行う）
+        self._send_notification_email(**report)
         
     # GmailからTwitter認証コードを取得する関数を追加
-    def _get_twitter_confirmation_code(self) -> Optional[str]:
-        """Gmailから最新のTwitter認証コードメールを取得し、コードを抽出する"""
-        import imaplib
-        import email
-        import re
-
+    def _get_twitter_confirmation_code(self, cancel: Optional[threading.Event] = None) -> Optional[str]:
+        """Gmailから最新のTwitter認証コードメールを取得し、コードを抽出する（cancelがセットされると中止する）"""
+        cancel = cancel or threading.Event()
         gmail_user = os.getenv("GMAIL_ADDRESS") # 環境変数からGmailアドレスを取得
         gmail_app_password = os.getenv("GMAIL_APP_PASSWORD") # 環境変数からGmailアプリパスワードを取得
 
+        # Gmail APIのトークンが設定されている場合は、IMAPを使わずAPIで件名だけを取得する
+        gmail_token_file = os.getenv("GMAIL_API_TOKEN_FILE")
+        if gmail_token_file:
+            try:
+                return self._get_code_via_gmail_api(gmail_token_file, cancel)
+            except Exception as e:
+                logger.error(f"An error occurred while retrieving confirmation code via Gmail API: {str(e)}")
+                return None
+
         if not all([gmail_user, gmail_app_password]):
             logger.warning("GMAIL_ADDRESS or GMAIL_APP_PASSWORD not set. Cannot retrieve confirmation code.")
             return None
 
-        confirmation_code = None
+        # 接続が切断されていた場合は張り直して1度だけ再試行する
+        for attempt in range(2):
+            # 中止された後に接続を張り直さない
+            if cancel.is_set():
+                return None
+            try:
+                return self._search_confirmation_code(self._ensure_imap(gmail_user, gmail_app_password), cancel)
+            except imaplib.IMAP4.abort as e:
+                logger.warning(f"IMAP connection aborted, reconnecting (attempt {attempt + 1}): {str(e)}")
+                self._close_imap()
+            except (imaplib.IMAP4.error, socket.timeout) as e:
+                # socket.timeout は Python 3.10 以降 TimeoutError の別名
+                logger.error(f"IMAP error occurred: {str(e)}")
+                self._close_imap()
+                return None
+            except Exception as e:
+                logger.error(f"An error occurred while retrieving confirmation code from email: {str(e)}")
+                return None
+        return None
+
+    def _record_code_baseline(self):
+        """パスワード送信前に届いている認証コードメールの最大UIDを記録し、以降の検索対象から外す"""
+        self._code_min_uid = None
+        # Gmail APIではパスワード送信時刻で絞り込むため、UIDの記録は不要
+        if os.getenv("GMAIL_API_TOKEN_FILE"):
+            return
+        gmail_user = os.getenv("GMAIL_ADDRESS")
+        gmail_app_password = os.getenv("GMAIL_APP_PASSWORD")
+        if not all([gmail_user, gmail_app_password]):
+            return
         try:
-            logger.info(f"Attempting to connect to Gmail IMAP server for user: {gmail_user}")
-            # IMAP_SSLでGmailに接続
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            # ログイン
-            mail.login(gmail_user, gmail_app_password)
-            logger.info("Logged in to Gmail IMAP server.")
-
-            # 受信トレイを選択
-            mail.select('inbox')
-            logger.info("Selected INBOX.")
-
-            # Twitterからの最新の認証コードメールを検索
-            # 送信元アドレスと件名でフィルタリング
-            # Twitterの認証コードメールの件名や送信元は変わる可能性があるため、適宜調整が必要
-            status, email_ids = mail.search(None,
-                                             '(FROM "info@x.com" SUBJECT "Your X confirmation code is ")')
-
-            if status == 'OK' and email_ids[0]:
-                # 最新のメールIDを取得
-                latest_email_id = email_ids[0].split()[-1]
-                logger.info(f"Found latest Twitter confirmation email with ID: {latest_email_id}")
-
-                # メールを取得
-                status, msg_data = mail.fetch(latest_email_id, '(RFC822)')
-                if status == 'OK':
-                    msg = email.message_from_bytes(msg_data[0][1])
-                    logger.info(f"Fetched email with subject: {msg['Subject']}")
-
-                    # メール本文から認証コードを抽出
-                    if msg.is_multipart():
-                        for part in msg.walk():
-                            ctype = part.get_content_type()
-                            cdisp = str(part.get('Content-Disposition'))
-
-                            # text/plain または text/html のパートを取得
-                            if ctype == 'text/plain' and 'attachment' not in cdisp:
-                                body = part.get_payload(decode=True).decode()
-                                # 本文から認証コード（例: 6桁の数字など、Twitterのコード形式に合わせる）を正規表現で抽出
-                                # 認証コードの形式に合わせて正規表現を調整してください
-                                # 件名または本文から "is " または ">" に続いて出現する英数字の連続を抽出
-                                match = re.search(r'is ([a-zA-Z0-9]+)', body) # 例: "is 123ABC" の形式
-                                if match:
-                                    confirmation_code = match.group(1)
-                                    logger.info(f"Extracted confirmation code from plain text body: {confirmation_code}")
-                                    break # コードが見つかったらループを抜ける
-
-                            elif ctype == 'text/html' and 'attachment' not in cdisp:
-                                body = part.get_payload(decode=True).decode()
-                                # HTML本文から認証コードを抽出
-                                # 認証コードの形式に合わせて正規表現を調整してください
-                                # 件名または本文から ">" に続いて出現する英数字の連続を抽出
-                                match = re.search(r'>([a-zA-Z0-9]+)<', body) # 例: <div>123ABC</div> の形式
-                                if match:
-                                    confirmation_code = match.group(1)
-                                    logger.info(f"Extracted confirmation code from HTML body: {confirmation_code}")
-                                    break # コードが見つかったらループを抜ける
-
-                    # TODO: メールを既読にするなど、必要に応じて処理を追加
-                    # mail.store(latest_email_id, '+FLAGS', '\\Seen')
+            mail = self._ensure_imap(gmail_user, gmail_app_password)
+            status, uids = mail.uid('SEARCH', None, *_CODE_MAIL_CRITERIA)
+            existing = uids[0].split() if status == 'OK' else []
+            self._code_min_uid = int(existing[-1]) + 1 if existing else 1
+            logger.info(f"Confirmation emails will be searched from UID {self._code_min_uid}.")
+        except Exception as e:
+            logger.warning(f"Failed to record the confirmation email baseline: {str(e)}")
+            self._close_imap()
+
+    def _get_code_via_gmail_api(self, token_file: str, cancel: threading.Event) -> Optional[str]:
+        """Gmail APIで最新の認証コードメールの件名を取得し、コードを抽出する"""
+        service = self._ensure_gmail_service(token_file)
+        query = 'from:info@x.com subject:"Your X confirmation code is"'
+        # パスワード送信後に届いたメールのみを対象にする（送信時刻が不明な場合は直近1時間）
+        query += f' after:{self._code_after}' if self._code_after else ' newer_than:1h'
+        for _ in range(IMAP_POLL_ATTEMPTS):
+            resp = service.users().messages().list(userId='me', q=query, maxResults=1).execute()
+            if resp.get('messages'):
+                break
+            # 待機中に中止された場合は、次のポーリングを行わずに終了する
+            if cancel.wait(IMAP_POLL_INTERVAL):
+                logger.info("Confirmation code retrieval cancelled.")
+                return None
+        else:
+            logger.warning("No Twitter confirmation email found via Gmail API.")
+            return None
 
-                else:
-                    logger.error(f"Failed to fetch email with ID {latest_email_id}. Status: {status}")
+        # 本文は取得せず、件名ヘッダーのみのメタデータを取得する
+        message_id = resp['messages'][0]['id']
+        meta = service.users().messages().get(userId='me', id=message_id, format='metadata',
+                                              metadataHeaders=['Subject']).execute()
+        subject = next((h['value'] for h in meta['payload']['headers'] if h['name'] == 'Subject'), '')
+        logger.info(f"Fetched email with subject: {subject}")
 
-            else:
-                logger.warning("No Twitter confirmation email found in INBOX.")
+        match = _CODE_RE_TEXT.search(subject.encode())
+        if not match:
+            logger.warning("Confirmation code not found in email subject.")
+            return None
+        confirmation_code = match.group(1).decode('ascii')
+        logger.info(f"Extracted confirmation code from subject: {confirmation_code}")
+        return confirmation_code
 
-        except imaplib.IMAP4.error as e:
-            logger.error(f"IMAP error occurred: {str(e)}")
-        except Exception as e:
-            logger.error(f"An error occurred while retrieving confirmation code from email: {str(e)}")
+    def _ensure_gmail_service(self, token_file: str):
+        """Gmail APIのクライアントを取得（初回のみ認証情報を読み込んで生成し、以降は再利用する）"""
+        if self._gmail_service is None:
+            # Gmail APIを使う場合にのみ必要なため、ここで読み込む
+            from google.oauth2.credentials import Credentials
+            from googleapiclient.discovery import build
+
+            creds = Credentials.from_authorized_user_file(token_file, ['https://www.googleapis.com/auth/gmail.readonly'])
+            self._gmail_service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+            logger.info("Gmail API client initialized.")
+        return self._gmail_service
+
+    def _ensure_imap(self, gmail_user: str, gmail_app_password: str) -> imaplib.IMAP4_SSL:
+        """IMAP接続を取得（接続済みであれば再利用し、ログインとINBOX選択は初回のみ行う）"""
+        if self._imap is not None:
+            return self._imap
+
+        logger.info(f"Attempting to connect to Gmail IMAP server for user: {gmail_user}")
+        # IMAP_SSLでGmailに接続（接続が固まった場合に無期限に待たないようタイムアウトを設定）
+        mail = imaplib.IMAP4_SSL('imap.gmail.com', timeout=10)
+        # ログイン
+        mail.login(gmail_user, gmail_app_password)
+        logger.info("Logged in to Gmail IMAP server.")
+
+        # 受信トレイを選択
+        mail.select('INBOX')
+        logger.info("Selected INBOX.")
+        self._imap = mail
+        return mail
+
+    def _close_imap(self):
+        """キャッシュしているIMAP接続を閉じる"""
+        if self._imap is None:
+            return
+        try:
+            self._imap.logout()
+            logger.info("Logged out from Gmail IMAP server.")
+        except (imaplib.IMAP4.error, OSError):
+            pass
         finally:
-            # 接続を閉じる
-            if 'mail' in locals() and mail:
-                try:
-                    mail.logout()
-                    logger.info("Logged out from Gmail IMAP server.")
-                except Exception as e:
-                     logger.error(f"Error during IMAP logout: {str(e)}")
+            self._imap = None
+
+    def _search_confirmation_code(self, mail: imaplib.IMAP4_SSL, cancel: threading.Event) -> Optional[str]:
+        """認証コードメールが届くまでポーリングし、届いた最新のメールからコードを抽出する"""
+        # Twitterからの最新の認証コードメールを検索
+        # 送信元アドレスと件名でフィルタリング
+        # Twitterの認証コードメールの件名や送信元は変わる可能性があるため、適宜調整が必要
+        criteria = _CODE_MAIL_CRITERIA
+        if self._code_min_uid is not None:
+            # パスワード送信前に届いていたメールは対象外とし、新しく届いたメールだけを検索する
+            criteria = ('UID', f'{self._code_min_uid}:*') + criteria
+        for _ in range(IMAP_POLL_ATTEMPTS):
+            # GmailはNOOPを送らないと新着メールが検索結果に反映されない
+            mail.noop()
+            # UID SEARCH で該当メールのUIDだけを取得する
+            status, uids = mail.uid('SEARCH', None, *criteria)
+            # 「n:*」は該当UIDがなくても最大UIDのメールに一致するため、基準未満のUIDは除外する
+            found = [uid for uid in (uids[0].split() if status == 'OK' else [])
+                     if self._code_min_uid is None or int(uid) >= self._code_min_uid]
+            if found:
+                break
+            # 待機中に中止された場合は、次のポーリングを行わずに終了する
+            if cancel.wait(IMAP_POLL_INTERVAL):
+                logger.info("Confirmation code retrieval cancelled.")
+                return None
+        else:
+            logger.warning("No Twitter confirmation email found in INBOX.")
+            return None
+
+        # 最新のメールUIDを取得
+        latest_uid = found[-1]
+        logger.info(f"Found latest Twitter confirmation email with UID: {latest_uid}")
+
+        confirmation_code = None
+        # 件名ヘッダーと本文の先頭だけを取得（RFC822全体は取得せず、PEEKで既読にもしない）
+        status, msg_data = mail.uid('FETCH', latest_uid,
+                                    '(BODY.PEEK[HEADER.FIELDS (SUBJECT)] BODY.PEEK[TEXT]<0.4096>)')
+        if status == 'OK':
+            header_bytes = b''
+            text_bytes = b''
+            for item in msg_data:
+                if isinstance(item, tuple):
+                    if b'HEADER' in item[0]:
+                        header_bytes = item[1]
+                    else:
+                        text_bytes = item[1]
+
+            subject = email.message_from_bytes(header_bytes).get('Subject', '')
+            logger.info(f"Fetched email with subject: {subject}")
+
+            # 認証コードは件名に含まれるため、まず件名ヘッダーのバイト列から抽出する
+            # 件名に無い場合のみ本文先頭の text/plain パート、次いで text/html パートを調べる
+            html_at = text_bytes.lower().find(b'content-type: text/html')
+            plain_bytes = text_bytes if html_at < 0 else text_bytes[:html_at]
+            html_bytes = text_bytes if html_at < 0 else text_bytes[html_at:]
+            candidates = (
+                ('subject', _CODE_RE_TEXT, header_bytes),
+                ('plain text body', _CODE_RE_TEXT, plain_bytes),
+                ('HTML body', _CODE_RE_HTML, html_bytes),
+            )
+            source, match = next(((name, m) for name, pattern, data in candidates if (m := pattern.search(data))), (None, None))
+            if match:
+                confirmation_code = match.group(1).decode('ascii')
+                logger.info(f"Extracted confirmation code from {source}: {confirmation_code}")
+        else:
+            logger.error(f"Failed to fetch email with UID {latest_uid}. Status: {status}")
 
         return confirmation_code
 
     def post_tweet(self, title: str, url: str) -> bool:
         """ツイートを投稿する"""
+        success = False
         try:
             logger.info(f"Starting tweet posting process for title: {title}")
-            # _loginメソッドは内部で_setup_driverを呼び出し、ログインに失敗した場合は例外を発生させます。
-            # 成功した場合のみ、以下の処理に進みます。
-            # post_tweet内で_setup_driverを呼ぶと、リトライ時に毎回新しいドライバーが起動してしまうため、
-            # _loginメソッドのretryデコレータがドライバーの再利用を前提としていない挙動になります。
-            # _loginメソッドの前に_setup_driverを呼ぶように修正します。
-            self._setup_driver()
-            logger.info("Driver setup complete in post_tweet")
-
-            # ログインを試行し、成功した場合のみ以降の処理に進む
-            if not self._login():
+            # ドライバーは_loginのリトライや永続セッションの後続の投稿で使い回すため、ここで用意する
+            self._ensure_driver()
+
+            # ログイン済みでなければログインを試行し、成功した場合のみ以降の処理に進む
+            if not self._ensure_logged_in():
                 logger.error("Login failed. Aborting tweet posting process.")
                 return False # ログイン失敗時はFalseを返して終了
 
-            # ツイート作成画面を開く
-            logger.info("Opening tweet composition screen...")
-            # ログイン後の画面が安定するまで待機
-            time.sleep(random.uniform(3, 7)) # ログイン後の静的待機をランダム化
+            # 投稿処理中のスクリーンショットを記録し直す
+            self._shots = {}
 
-            try:
-                # 投稿ボタンが表示されるまで待機
-                post_button = self.wait.until(EC.element_to_be_clickable((By.XPATH, '//a[@aria-label="Post"]')))
-                
-                # 人間らしい操作シミュレーション: スクロールとマウス移動
-                self._simulate_human_like_movement(post_button)
-                time.sleep(random.uniform(0.5, 1.5)) # 操作前の短い待機
-
-                post_button.click()
-            except TimeoutException:
-                logger.error("Timeout waiting for tweet post button.")
-                screenshot_path = self._save_screenshot("post_button_timeout")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': "Timeout waiting for tweet post button.", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Tweet Post Button Timeout", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise TimeoutException("Timeout waiting for tweet post button.")
-            except NoSuchElementException:
-                logger.error("Tweet post button not found.")
-                screenshot_path = self._save_screenshot("post_button_not_found")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': "Tweet post button not found.", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Tweet Post Button Not Found", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise NoSuchElementException("Tweet Post Button Not Found.")
-            except Exception as e:
-                logger.error(f"Error clicking tweet post button: {str(e)}")
-                screenshot_path = self._save_screenshot("post_button_error")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': str(e), 'screenshot_path': screenshot_path}
-                self._send_error_notification("Tweet Post Button Error", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise
+            # ツイート作成画面を開く（投稿ボタンをクリックせず、作成画面のURLへ直接遷移する）
+            logger.info("Opening tweet composition screen...")
+            self._navigate(COMPOSE_URL)
 
             # ツイート内容の入力
             logger.info("Entering tweet content...")
-            # ツイート作成モーダルが表示されるのを待機
-            time.sleep(random.uniform(2, 4)) # モーダル表示の静的待機をランダム化
 
-            try:
-                # ツイート入力エリアが表示されるまで待機
-                tweet_box = self.wait.until(EC.presence_of_element_located((By.XPATH, '//div[@data-testid="tweetTextarea_0"]')))
+            with self._ui_step("Tweet Area", "tweet_area"):
                 tweet_content = f"{title}\n{url}"
-                
-                # 人間らしい操作シミュレーション: スクロールとマウス移動
-                self._simulate_human_like_movement(tweet_box)
-                time.sleep(random.uniform(0.5, 1.5)) # 操作前の短い待機
-
-                # タイピングを人間らしくシミュレーション
-                actions = ActionChains(self.driver)
-                for char in tweet_content:
-                    actions.send_keys(char)
-                    actions.pause(random.uniform(0.03, 0.15)) # ランダムな短い遅延
-                actions.perform()
-                time.sleep(random.uniform(1, 3))
-            except TimeoutException:
-                logger.error("Timeout waiting for tweet text area.")
-                screenshot_path = self._save_screenshot("tweet_area_timeout")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': "Timeout waiting for tweet text area.", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Tweet Area Timeout", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise TimeoutException("Timeout waiting for tweet text area.")
-            except NoSuchElementException:
-                logger.error("Tweet text area not found.")
-                screenshot_path = self._save_screenshot("tweet_area_not_found")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': "Tweet text area not found.", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Tweet Area Not Found", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise NoSuchElementException("Tweet text Area Not Found.")
-            except Exception as e:
-                logger.error(f"Error entering tweet content: {str(e)}")
-                screenshot_path = self._save_screenshot("tweet_content_error")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': str(e), 'screenshot_path': screenshot_path}
-                self._send_error_notification("Tweet Content Error", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise
+
+                def insert_tweet():
+                    # ツイート作成画面の入力エリアが表示されるまで待機（再試行時は要素を取得し直す）
+                    tweet_box = WebDriverWait(self.driver, COMPOSE_WAIT_TIMEOUT, poll_frequency=0.25).until(
+                        EC.presence_of_element_located(TWEET_BOX_LOC)
+                    )
+
+                    # 人間らしい操作シミュレーション: スクロールとマウス移動
+                    self._simulate_human_like_movement(tweet_box)
+
+                    # 1文字ずつのキー送信ではなく、1回のスクリプト実行でまとめて入力する
+                    # （要素が無効な場合はスクリプト自体が実行されないため、再試行しても二重に入力されない）
+                    if not self.driver.execute_script(_JS_INSERT_TEXT_SCRIPT, tweet_box, tweet_content):
+                        # execCommandが使えない場合のみ、従来どおりキー送信で入力する
+                        logger.warning("insertText was not applied, falling back to send_keys")
+                        tweet_box.send_keys(tweet_content)
+
+                self._retry_stale("Tweet Area", insert_tweet)
+                # 最後に挿入したURLまでエディタに反映されたことを確認してから投稿ボタンへ進む
+                # （絵文字は画像で描画されるため、本文全体の完全一致では判定しない。再描画に備えて毎回要素を取得する）
+                WebDriverWait(self.driver, 10, ignored_exceptions=[StaleElementReferenceException]).until(
+                    lambda d: url in d.find_element(*TWEET_BOX_LOC).text
+                )
 
             # 投稿ボタンのクリック
             logger.info("Clicking post button...\n")
-            try:
-                # ツイート作成モーダル内の投稿ボタンを対象とする
-                tweet_button = self.wait.until(EC.element_to_be_clickable((By.XPATH, '//div[@data-testid="tweetComposer"]//button[@data-testid="tweetButton"]')))
-                
-                # 人間らしい操作シミュレーション: スクロールとマウス移動
-                self._simulate_human_like_movement(tweet_button)
-                time.sleep(random.uniform(0.5, 1.5)) # 操作前の短い待機
-
-                tweet_button.click()
-            except TimeoutException:
-                logger.error("Timeout waiting for final tweet button.")
-                screenshot_path = self._save_screenshot("final_tweet_button_timeout")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': "Timeout waiting for final tweet button.", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Final Tweet Button Timeout", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise TimeoutException("Timeout waiting for final tweet button.")
-            except NoSuchElementException:
-                logger.error("Final tweet button not found.")
-                screenshot_path = self._save_screenshot("final_tweet_button_not_found")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': "Final tweet button not found.", 'screenshot_path': screenshot_path}
-                self._send_error_notification("Final Tweet Button Not Found", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise NoSuchElementException("Final Tweet Button Not Found.")
-            except Exception as e:
-                logger.error(f"Error clicking final tweet button: {str(e)}")
-                screenshot_path = self._save_screenshot("final_tweet_button_error")
-                error_info = {'url': self.driver.current_url if self.driver else "N/A", 'error': str(e), 'screenshot_path': screenshot_path}
-                self._send_error_notification("Final Tweet Button Error", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
-                raise
+            with self._ui_step("Final Tweet Button", "final_tweet_button"):
+
+                def click_tweet_button():
+                    # ツイート作成モーダル内の投稿ボタンを対象とし、入力が反映されて有効化されるまで待機
+                    tweet_button = self._wait_for_css(TWEET_BUTTON_LOC[1], TWEET_BUTTON_TIMEOUT, clickable=True)
+
+                    # 人間らしい操作シミュレーション: スクロールとマウス移動
+                    self._simulate_human_like_movement(tweet_button)
+
+                    tweet_button.click()
 
-            # 投稿完了の待機 (成功メッセージやツイートが表示されるのを待つなど、より具体的な条件にすることも検討)
+                self._retry_stale("Final Tweet Button", click_tweet_button)
+
+            # 投稿完了の待機（投稿が受け付けられるとツイート作成モーダルが閉じる）
             logger.info("Waiting for tweet completion...")
-            time.sleep(random.uniform(5, 15)) # 投稿後の静的な待機をランダム化
-            # TODO: ツイートが成功したことを示す要素や画面遷移を待つ条件を追加
-            logger.info("Tweet posting process finished (Success confirmation might be needed).\n")
+            with self._ui_step("Tweet Completion", "tweet_completion"):
+                WebDriverWait(self.driver, 15).until(
+                    EC.invisibility_of_element_located(COMPOSER_LOC)
+                )
+            logger.info("Tweet posting process finished.\n")
             
             # 正常終了時も通知メールを送信
-            success_info = {
-                 'url': self.driver.current_url if self.driver else "N/A",
-                 'title': title,
-                 'memory_usage': psutil.Process(os.getpid()).memory_percent()
-            }
-            self._send_notification_email('Twitter Post Success', 'ツイート投稿が正常に完了しました。\n', [], "twitter_bot.log")
+            self._queue_notification('Twitter Post Success', 'ツイート投稿が正常に完了しました。\n', [], "twitter_bot.log")
 
+            success = True
             return True
             
         except Exception as e:
             logger.error(f"Failed to post tweet. Error: {str(e)}")
+            # 失敗後はログイン状態が不明なため、次の投稿ではホーム画面で確認し直す
+            self._session_verified = False
             self._check_memory_usage()
-            screenshot_path = self._save_screenshot("post_tweet_error")
+            if e is self._reported_error:
+                # 失敗したステップで通知済みのため、ここでは結果を返すのみ
+                return False
+            screenshot_path = self._shot("post_tweet_error")
             if screenshot_path:
                 logger.info(f"Error screenshot saved: {screenshot_path}")
-            current_url = self.driver.current_url if self.driver else "N/A"
+            current_url = self._current_url()
             logger.error(f"Tweet post failed at URL: {current_url}\n")
             
             # 投稿失敗時のメール通知
@@ -1021,21 +1816,67 @@ URL: {error_info.get('url', 'N/A')}
                 'error': str(e),
                 'screenshot_path': screenshot_path
             }
-            self._send_error_notification("Tweet Post Failed", error_info, [screenshot_path] if screenshot_path else [], "twitter_bot.log")
+            self._send_error_notification("Tweet Post Failed", error_info, self._all_shots(), "twitter_bot.log")
             
             return False
             
         finally:
-            self.cleanup()
-
-if __name__ == "__main__":
-    test_title = os.getenv("TEST_TWEET_TITLE", "テスト投稿タイトル")
-    test_url = os.getenv("TEST_TWEET_URL", "https://example.com")
+            # 例外が保持するトレースバック（WebElement参照を含む）を次の投稿まで残さない
+            self._reported_error = None
+            # この投稿で発生したエラー通知をまとめて送る
+            self._flush_notifications()
+            # ドライバーを使い回す場合も成功時のみ残し、次の投稿で再利用する
+            # （失敗時はブラウザの状態が不明なため閉じ、次の投稿では保存済みのクッキー等から起動し直す）
+            if not (self.keep_driver and success):
+                self.cleanup()
+
+def _read_batch_items() -> list[Dict[str, str]]:
+    """投稿する項目を標準入力のJSONから読み込む（標準入力が端末または空の場合はテスト用の1件を返す）"""
+    raw = "" if sys.stdin is None or sys.stdin.isatty() else sys.stdin.read()
+    if not raw.strip():
+        return [{
+            'title': os.getenv("TEST_TWEET_TITLE", "テスト投稿タイトル"),
+            'url': os.getenv("TEST_TWEET_URL", "https://example.com"),
+        }]
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"stdin is not valid JSON: {str(e)}") from e
+    if not isinstance(items, list):
+        raise ValueError("stdin must be a JSON list of {\"title\": ..., \"url\": ...} objects")
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('title'), str) or not isinstance(item.get('url'), str):
+            raise ValueError(f"item {i} must be an object with string \"title\" and \"url\": {item!r}")
+    return items
+
+
+def main():
+    """標準入力のJSON（[{"title": ..., "url": ...}, ...]）の各項目を、1つのブラウザで順に投稿する
+
+    標準入力が端末または空の場合は、環境変数のテスト用タイトル・URLを1件だけ投稿する。
+    """
+    try:
+        items = _read_batch_items()
+    except ValueError as e:
+        logger.error(f"Invalid tweet batch input: {str(e)}")
+        return 2
+
+    # 全件で同じブラウザとログイン状態を使い回し、終了時にまとめて閉じる
+    # （プロファイルの保存は環境変数に従い、重複して起動したCLIやサーバーとプロファイルを取り合わないようにする）
+    bot = TwitterBot(keep_driver=True)
+    failures = 0
+    try:
+        for item in items:
+            if bot.post_tweet(item['title'], item['url']):
+                logger.info("ツイート投稿処理が成功しました。\n")
+            else:
+                failures += 1
+                logger.error("ツイート投稿処理が失敗しました。\n")
+    finally:
+        bot.close()
+    logger.info(f"{len(items) - failures}/{len(items)} tweets posted.")
+    return 1 if failures else 0
 
-    bot = TwitterBot()
-    success = bot.post_tweet(test_title, test_url)
 
-    if success:
-        logger.info("ツイート投稿処理が成功しました。\n")
-    else:
-        logger.error("ツイート投稿処理が失敗しました。\n")
+if __name__ == "__main__":
+    sys.exit(main())